@@ -17,9 +17,22 @@ User inputs a query:
 → [Response from Assistant]
     ↓
 → [Print the Output]
+
+→ SPECULATIVE MODE (speculative_invoke)
+
+The classifier and the most likely department chain start together. The
+guess comes from a keyword prior or the session's last destination.
+    → classifier agrees    → the speculative answer is used (one round trip)
+    → classifier disagrees → the speculative call is cancelled and the right chain runs
+SpeculationStats tracks the hit rate and the tokens spent on wrong guesses.
 """
 
 import os
+import re
+import sys
+import asyncio
+import logging
+from dataclasses import dataclass
 from pathlib import Path
 from dotenv import load_dotenv
 from typing import Literal, TypedDict
@@ -30,6 +43,12 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 
+# → Make the shared helpers in the repo root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from context_compression import count_tokens
+
+logger = logging.getLogger(__name__)
+
 # -------------------------------
 # → STEP 1: LOAD ENVIRONMENT AND INIT MODEL
 # -------------------------------
@@ -59,12 +78,14 @@ dept_defs = {
 }
 
 # → Create individual assistant chains per department
+prompts = {}
 chains = {}
 for name, desc in dept_defs.items():
     prompt = ChatPromptTemplate.from_messages([
         ("system", f"You are the {name.upper()} Assistant: {desc}."),
         ("human", "{query}")
     ])
+    prompts[name] = prompt
     chains[name] = prompt | llm | StrOutputParser()
 
 # -------------------------------
@@ -98,7 +119,96 @@ router = {
 full_chain = router | RunnableLambda(lambda ctx: chains[ctx["destination"]])
 
 # -------------------------------
-# → STEP 5: TEST INPUTS
+# → STEP 5: SPECULATIVE ROUTING
+# -------------------------------
+
+# → Cheap local prior: keyword hits per department, no LLM call
+dept_keywords = {
+    "hr": {"leave", "leaves", "vacation", "holiday", "benefits", "policy", "maternity", "pto", "hr"},
+    "finance": {"salary", "deducted", "deduction", "reimbursement", "budget", "payroll", "expense", "tax"},
+    "helpdesk": {"crash", "crashing", "password", "login", "outlook", "laptop", "vpn", "printer", "error"},
+    "dev": {"code", "bug", "deploy", "api", "python", "git", "repository", "build", "function"},
+}
+
+# → Last destination per session, used when the keywords give no signal
+last_destination = {}
+
+
+def guess_destination(query, session_id=None):
+    words = set(re.findall(r"\w+", query.lower()))
+    scores = {name: len(words & keywords) for name, keywords in dept_keywords.items()}
+    best = max(scores, key=scores.get)
+    if scores[best] > 0:
+        return best
+    return last_destination.get(session_id)
+
+
+@dataclass
+class SpeculationStats:
+    attempts: int = 0
+    hits: int = 0
+    wasted_tokens: int = 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.attempts if self.attempts else 0.0
+
+
+speculation_stats = SpeculationStats()
+
+
+def spent_tokens(name, query, response=None):
+    """
+    Tokens billed for a department call: real usage if it finished, else the prompt size.
+
+    The prompt is counted locally (tiktoken cl100k_base or a character
+    estimate): llm.get_num_tokens_from_messages needs a model name, which
+    an Azure deployment does not expose.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage["total_tokens"]
+    return sum(count_tokens(m.content) for m in prompts[name].format_messages(query=query))
+
+
+async def speculative_invoke(query, session_id=None):
+    """
+    Routes `query` while already answering it with the most likely department.
+    """
+    guess = guess_destination(query, session_id)
+    if guess is None:
+        destination = await route_chain.ainvoke({"query": query})
+        last_destination[session_id] = destination
+        return await chains[destination].ainvoke({"query": query})
+
+    speculation_stats.attempts += 1
+    route_task = asyncio.create_task(route_chain.ainvoke({"query": query}))
+    guess_task = asyncio.create_task((prompts[guess] | llm).ainvoke({"query": query}))
+
+    try:
+        destination = await route_task
+    except BaseException:
+        guess_task.cancel()
+        raise
+    last_destination[session_id] = destination
+
+    if destination == guess:
+        speculation_stats.hits += 1
+        return (await guess_task).content
+
+    # → Wrong guess: cancel the in-flight call, answer with the right chain,
+    #   then count what the guess cost. Accounting must never fail the query
+    response = guess_task.result() if guess_task.done() and not guess_task.exception() else None
+    guess_task.cancel()
+    answer = await chains[destination].ainvoke({"query": query})
+    try:
+        speculation_stats.wasted_tokens += spent_tokens(guess, query, response)
+    except Exception:
+        logger.warning("could not count tokens of the cancelled %s call", guess, exc_info=True)
+    return answer
+
+# -------------------------------
+# → STEP 6: TEST INPUTS
 # -------------------------------
 
 if __name__ == "__main__":
@@ -111,3 +221,16 @@ if __name__ == "__main__":
     for q in test_queries:
         result = full_chain.invoke({"query": q})
         print(f"\n→ {q}\n→ {result}")
+
+    # → Same queries in speculative mode
+    async def run_speculative():
+        for q in test_queries:
+            result = await speculative_invoke(q, session_id="demo")
+            print(f"\n→ [speculative] {q}\n→ {result}")
+
+    asyncio.run(run_speculative())
+    print(
+        f"\n→ Speculation hit rate: {speculation_stats.hit_rate:.0%} "
+        f"({speculation_stats.hits}/{speculation_stats.attempts}), "
+        f"wasted tokens: {speculation_stats.wasted_tokens}"
+    )
@@ -1,4 +1,5 @@
 import os
+import sys
 import atexit
 from pathlib import Path
 from dotenv import load_dotenv
@@ -15,6 +16,11 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_community.chat_message_histories import SQLChatMessageHistory
 
+# → Make the shared helpers in the repo root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from context_compression import ContextCompressor, compress_inputs
+from session_maintenance import SessionMaintainer, llm_summarizer
+
 # -------------------------------
 # → LOAD ENVIRONMENT VARIABLES
 # -------------------------------
@@ -63,18 +69,40 @@ llm = AzureChatOpenAI(
     temperature=0.5  # → Controls randomness of output
 )
 
-# → Chain: Prompt → LLM → OutputParser
-chain = prompt | llm | StrOutputParser()
+# → Compress history before it reaches the prompt: near-duplicate messages are
+#   dropped and older turns are trimmed to the most relevant sentences so the
+#   history section never exceeds its token budget
+compressor = ContextCompressor(budgets={"history": 1500})
+compress = compress_inputs(
+    compressor,
+    question_key="input",
+    history_key="history",
+    on_report=lambda report: print(f"   (context compression: {report})"),
+)
+
+# → Chain: Compress → Prompt → LLM → OutputParser
+chain = compress | prompt | llm | StrOutputParser()
 
 # -------------------------------
 # → SQLITE-BASED MESSAGE HISTORY
 # -------------------------------
 
-# → Initialize database connection using SQLAlchemy
-engine = create_engine("sqlite:///chat_history.db", future=True)
+# → Initialize database connection using SQLAlchemy (DB lives next to this script, not the CWD)
+db_path = Path(__file__).resolve().parent / "chat_history.db"
+engine = create_engine(f"sqlite:///{db_path}", future=True)
+
+# → Background maintenance: archives idle sessions, expires old archives,
+#   summarizes long sessions and reclaims space without blocking chats
+maintainer = SessionMaintainer(
+    engine,
+    archive_dir=db_path.parent / "chat_archive",
+    summarize=llm_summarizer(llm),
+).start()
 
-# → Function to return SQL-based chat history per session
+# → Function to return SQL-based chat history per session; an archived
+#   session is restored into the database first so nothing is forgotten
 def get_history(session_id: str):
+    maintainer.restore(session_id)
     return SQLChatMessageHistory(session_id=session_id, connection=engine)
 
 # → Wrap the LLM chain with session-aware message history
@@ -100,8 +128,9 @@ def chat(session_id: str, user_input: str):
 # → CLEANUP HOOK (OPTIONAL)
 # -------------------------------
 
-# → This is optional because SQLChatMessageHistory saves instantly
+# → SQLChatMessageHistory saves instantly, so only the maintenance thread needs stopping
 def cleanup():
+    maintainer.stop()
     print("→ Cleanup executed. No in-memory buffer to flush due to SQL-based persistence.")
 
 atexit.register(cleanup)
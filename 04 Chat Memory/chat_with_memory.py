@@ -13,6 +13,9 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_community.chat_message_histories import SQLChatMessageHistory
 
+from compact_history import CompactHistoryStore
+from session_maintenance import SessionMaintainer, llm_summarizer
+
 # → Load environment variables from .env file
 env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(env_path)
@@ -59,9 +62,24 @@ chain = prompt | llm | StrOutputParser()
 db_path = Path(__file__).resolve().parent / "chat_history.db"
 engine = create_engine(f"sqlite:///{db_path}")
 
-# → Function to fetch chat history for a given session
+# → Cache of compact per-session histories; only the last 20 messages are
+#   turned into BaseMessage objects and sent to the model
+history_store = CompactHistoryStore(engine, window=20)
+
+# → Background maintenance (archive, expire, summarize, vacuum); sessions it
+#   rewrites are evicted from the compact cache so they reload fresh
+maintainer = SessionMaintainer(
+    engine,
+    archive_dir=db_path.parent / "chat_archive",
+    summarize=llm_summarizer(llm),
+    on_change=history_store.evict,
+).start()
+
+# → Function to fetch chat history for a given session; an archived session
+#   is restored into the database first so returning users keep their history
 def get_history(session_id: str):
-    return SQLChatMessageHistory(session_id=session_id, connection=engine)
+    maintainer.restore(session_id)
+    return history_store.get(session_id)
 
 # → Wrap chain with message history tracking
 with_history = RunnableWithMessageHistory(
@@ -113,3 +131,5 @@ if __name__ == "__main__":
 
     # → Output all session histories
     print_all_sessions_json()
+
+    maintainer.stop()
@@ -0,0 +1,326 @@
+# compact_history.py
+
+"""
+→ COMPACT IN-PROCESS CHAT HISTORY
+
+SQLChatMessageHistory turns every stored row into a full pydantic
+BaseMessage. With thousands of cached sessions that overhead dominates
+resident memory. This module keeps histories in a columnar layout instead:
+
+→ [roles]   array('B')  → one byte per message (human / ai / system / ...)
+→ [offsets] array('Q')  → end offset of each message in the arena
+→ [arena]   bytearray   → all message contents, UTF-8, back to back
+→ [cold]    zstd blocks → older messages compressed in fixed-size blocks
+
+BaseMessage objects are built only for the window actually sent to the
+model (CompactHistory.window), and thrown away after the call.
+
+Usage:
+    store = CompactHistoryStore(engine, window=20)
+    history = store.get("session_A")   # → BaseChatMessageHistory for RunnableWithMessageHistory
+"""
+
+import json
+import threading
+from array import array
+from collections import OrderedDict
+
+import zstandard
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    SystemMessage,
+    messages_from_dict,
+    message_to_dict,
+)
+from langchain_community.chat_message_histories import SQLChatMessageHistory
+
+# -------------------------------
+# → ROLE CODES
+# -------------------------------
+
+# → Plain text messages are stored as role code + content only
+ROLE_CODES = {"human": 0, "ai": 1, "system": 2}
+ROLE_CLASSES = {0: HumanMessage, 1: AIMessage, 2: SystemMessage}
+
+# → Anything else (tool calls, multimodal content, ...) is kept as its full JSON dict
+RAW_JSON = 255
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def _is_plain(msg_type, data):
+    """
+    True when a stored message carries nothing worth keeping besides its text.
+    """
+    return (
+        msg_type in ROLE_CODES
+        and isinstance(data.get("content"), str)
+        and not data.get("tool_calls")
+        and not data.get("invalid_tool_calls")
+        and not data.get("name")
+    )
+
+# -------------------------------
+# → COLD TIER BLOCK
+# -------------------------------
+
+class ColdBlock:
+    """
+    A run of older messages: roles and offsets stay uncompressed, the arena
+    is a single zstd frame.
+    """
+
+    __slots__ = ("roles", "offsets", "frame")
+
+    def __init__(self, roles, offsets, arena):
+        self.roles = roles
+        self.offsets = offsets
+        self.frame = _compressor.compress(bytes(arena))
+
+    def __len__(self):
+        return len(self.roles)
+
+    def nbytes(self):
+        return len(self.roles) + self.offsets.itemsize * len(self.offsets) + len(self.frame)
+
+    def items(self):
+        arena = _decompressor.decompress(self.frame)
+        start = 0
+        for role, end in zip(self.roles, self.offsets):
+            yield role, arena[start:end]
+            start = end
+
+# -------------------------------
+# → COMPACT HISTORY
+# -------------------------------
+
+class CompactHistory:
+    """
+    Columnar, append-only message history with a zstd-compressed cold tier.
+
+    The newest `hot_limit` messages stay uncompressed; once the hot tier
+    exceeds that by `block_size`, its oldest `block_size` messages are frozen
+    into a ColdBlock.
+    """
+
+    __slots__ = ("roles", "offsets", "arena", "cold", "hot_limit", "block_size")
+
+    def __init__(self, hot_limit=64, block_size=64):
+        self.roles = array("B")
+        self.offsets = array("Q")
+        self.arena = bytearray()
+        self.cold = []
+        self.hot_limit = hot_limit
+        self.block_size = block_size
+
+    def __len__(self):
+        return sum(len(block) for block in self.cold) + len(self.roles)
+
+    # → Writing
+
+    def append_raw(self, msg_type, data):
+        """
+        Appends one message given as its stored (type, data) pair.
+        """
+        if _is_plain(msg_type, data):
+            role, payload = ROLE_CODES[msg_type], data["content"]
+        else:
+            role, payload = RAW_JSON, json.dumps({"type": msg_type, "data": data})
+
+        self.arena += payload.encode("utf-8")
+        self.roles.append(role)
+        self.offsets.append(len(self.arena))
+
+        if len(self.roles) >= self.hot_limit + self.block_size:
+            self._freeze_oldest()
+
+    def append(self, message):
+        stored = message_to_dict(message)
+        self.append_raw(stored["type"], stored["data"])
+
+    def _freeze_oldest(self):
+        n = self.block_size
+        cut = self.offsets[n - 1]
+
+        self.cold.append(ColdBlock(self.roles[:n], self.offsets[:n], self.arena[:cut]))
+
+        self.roles = self.roles[n:]
+        self.offsets = array("Q", (end - cut for end in self.offsets[n:]))
+        del self.arena[:cut]
+
+    def clear(self):
+        self.roles = array("B")
+        self.offsets = array("Q")
+        self.arena = bytearray()
+        self.cold = []
+
+    # → Reading
+
+    def _hot_items(self, start=0):
+        begin = self.offsets[start - 1] if start > 0 else 0
+        for i in range(start, len(self.roles)):
+            end = self.offsets[i]
+            yield self.roles[i], self.arena[begin:end]
+            begin = end
+
+    @staticmethod
+    def _materialize(role, payload):
+        if role == RAW_JSON:
+            return messages_from_dict([json.loads(bytes(payload))])[0]
+        return ROLE_CLASSES[role](content=bytes(payload).decode("utf-8"))
+
+    def window(self, k=None):
+        """
+        Builds BaseMessage objects for the last `k` messages only (all if k is None).
+        """
+        total = len(self)
+        k = total if k is None else min(k, total)
+        if k <= 0:
+            return []
+
+        hot = len(self.roles)
+        if k <= hot:
+            items = list(self._hot_items(hot - k))
+        else:
+            # → Decompress only the cold blocks the window reaches into
+            needed, blocks = k - hot, []
+            for block in reversed(self.cold):
+                blocks.append(block)
+                needed -= len(block)
+                if needed <= 0:
+                    break
+            items = [item for block in reversed(blocks) for item in block.items()]
+            items = items[len(items) - (k - hot):] + list(self._hot_items())
+
+        return [self._materialize(role, payload) for role, payload in items]
+
+    def nbytes(self):
+        """
+        Approximate bytes held by the history payload (excluding object headers).
+        """
+        hot = len(self.roles) + self.offsets.itemsize * len(self.offsets) + len(self.arena)
+        return hot + sum(block.nbytes() for block in self.cold)
+
+# -------------------------------
+# → SQL-BACKED CHAT HISTORY
+# -------------------------------
+
+class CompactChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history for RunnableWithMessageHistory: writes go straight to SQL,
+    reads come from the in-memory CompactHistory and only return the last
+    `window` messages.
+    """
+
+    def __init__(self, sql_history, compact, window=20):
+        self.sql_history = sql_history
+        self.compact = compact
+        self.window = window
+
+    @property
+    def messages(self):
+        return self.compact.window(self.window)
+
+    def add_messages(self, messages):
+        self.sql_history.add_messages(messages)
+        for message in messages:
+            self.compact.append(message)
+
+    def clear(self):
+        self.sql_history.clear()
+        self.compact.clear()
+
+
+class CompactHistoryStore:
+    """
+    LRU cache of CompactHistory objects, loaded lazily from `message_store`.
+
+    Rows are parsed straight from their JSON into the columnar layout, so a
+    session is never materialized as a full list of BaseMessage objects.
+
+    Thread-safe: evict() may be called from another thread (e.g. the
+    SessionMaintainer's on_change). A load that was already reading when an
+    evict happened is returned to its caller but not cached, since it may
+    hold rows the maintainer has just rewritten.
+    """
+
+    def __init__(self, engine, table_name="message_store", window=20, max_sessions=10_000,
+                 hot_limit=64, block_size=64):
+        self.engine = engine
+        self.table_name = table_name
+        self.window = window
+        self.max_sessions = max_sessions
+        self.hot_limit = hot_limit
+        self.block_size = block_size
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # → bumped by every evict()
+
+    def _load(self, session_id):
+        """
+        Reads a session into a new CompactHistory.
+
+        Only a missing table counts as an empty history. Any other error (e.g.
+        "database is locked") propagates, so get_compact() never caches a
+        half-loaded or empty copy of a session that has messages.
+        """
+        compact = CompactHistory(hot_limit=self.hot_limit, block_size=self.block_size)
+        query = text(f"SELECT message FROM {self.table_name} WHERE session_id = :sid ORDER BY id")
+
+        with self.engine.connect() as conn:
+            try:
+                rows = conn.execute(query, {"sid": session_id})
+            except OperationalError as exc:
+                # → Table not created yet: SQLChatMessageHistory creates it on first use
+                if "no such table" not in str(exc.orig):
+                    raise
+                return compact
+            for (raw,) in rows:
+                stored = json.loads(raw)
+                compact.append_raw(stored["type"], stored["data"])
+
+        return compact
+
+    def get_compact(self, session_id):
+        with self._lock:
+            compact = self._sessions.get(session_id)
+            if compact is not None:
+                self._sessions.move_to_end(session_id)
+                return compact
+            generation = self._generation
+
+        # → Loaded outside the lock so one slow session never blocks the others.
+        #   A failed load raises before anything is cached and is retried on the next call
+        compact = self._load(session_id)
+
+        with self._lock:
+            if self._generation != generation:
+                return compact
+            # → Another thread may have loaded the same session meanwhile; share its copy
+            compact = self._sessions.setdefault(session_id, compact)
+            self._sessions.move_to_end(session_id)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return compact
+
+    def get(self, session_id):
+        # → Created first so that it sets up `message_store` before the initial load
+        sql_history = SQLChatMessageHistory(
+            session_id=session_id, connection=self.engine, table_name=self.table_name
+        )
+        return CompactChatMessageHistory(sql_history, self.get_compact(session_id), self.window)
+
+    def evict(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._generation += 1
+
+    def nbytes(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return sum(compact.nbytes() for compact in sessions)
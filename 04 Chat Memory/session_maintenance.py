@@ -0,0 +1,514 @@
+# session_maintenance.py
+
+"""
+→ BACKGROUND MAINTENANCE FOR chat_history.db
+
+SQLChatMessageHistory only ever inserts, so the database grows forever.
+SessionMaintainer runs in a daemon thread and, on every tick:
+
+→ [Track Activity]   → notes when each session last received a message
+→ [Archive]          → idle sessions are written to <archive_dir>/<sha256>.jsonl.zst
+                       and removed from message_store; restore(session_id) moves
+                       them back when the user returns
+→ [Expire]           → archives idle past the TTL are deleted for good
+→ [Compact]          → long sessions get their old turns replaced by one stored
+                       summary message (needs a `summarize` callable)
+→ [Reclaim Space]    → PRAGMA incremental_vacuum / PRAGMA optimize
+
+Chat latency comes first. The database runs in WAL mode so maintenance reads
+never block chat writes. Every write is a short transaction of at most
+`batch_size` rows, followed by a pause. If the chat holds the write lock,
+the maintainer gives up quickly (small busy_timeout) and tries again next
+tick, instead of queueing behind the chat.
+
+Archival is not forgetting: call restore(session_id) before loading a
+session's history (both chat scripts do it in get_history). Only archives
+idle past the TTL are gone for good.
+
+Usage:
+    maintainer = SessionMaintainer(engine, archive_dir="archive", summarize=summarize_fn)
+    maintainer.start()
+    ...
+    maintainer.restore(session_id)     # → before reading the session's history
+    ...
+    maintainer.stop()
+
+Freed pages only go back to disk with incremental auto-vacuum. Switching an
+existing database needs one full VACUUM, so it is a separate offline step:
+    python "04 Chat Memory/session_maintenance.py" chat_history.db --enable-incremental-vacuum
+"""
+
+import re
+import json
+import hashlib
+import time
+import logging
+import argparse
+import threading
+from pathlib import Path
+
+import zstandard
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from langchain_core.messages import SystemMessage, messages_from_dict, message_to_dict
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+def llm_summarizer(llm):
+    """
+    Builds a `summarize` callable for SessionMaintainer from a chat model.
+    """
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain_core.output_parsers import StrOutputParser
+
+    prompt = ChatPromptTemplate.from_messages([
+        MessagesPlaceholder("history"),
+        ("human", "Summarize the conversation above in a few sentences. "
+                  "Keep every fact the user shared about themselves (name, email, preferences)."),
+    ])
+    chain = prompt | llm | StrOutputParser()
+    return lambda messages: chain.invoke({"history": messages})
+
+
+class SessionMaintainer:
+    """
+    Throttled TTL expiry, archival, summary compaction and vacuuming for a
+    SQLChatMessageHistory database.
+    """
+
+    def __init__(
+        self,
+        engine,
+        archive_dir,
+        table_name="message_store",
+        archive_after=7 * 24 * 3600,    # → seconds idle before a session is archived
+        ttl=90 * 24 * 3600,             # → seconds idle before an archive is deleted
+        summarize=None,                 # → callable(list[BaseMessage]) -> str
+        summarize_after=200,            # → compact sessions longer than this many messages
+        keep_recent=40,                 # → messages left untouched by compaction
+        summarize_retry_after=3600,     # → seconds before a failed summary is tried again
+        batch_size=200,                 # → max rows per write transaction
+        pause=0.05,                     # → seconds to sleep between write transactions
+        busy_timeout_ms=20,             # → how long to wait for the write lock before backing off
+        vacuum_pages=200,               # → pages freed per incremental_vacuum call
+        interval=60.0,                  # → seconds between ticks
+        on_change=None,                 # → callable(session_id) after a session is rewritten
+    ):
+        if not re.fullmatch(r"\w+", table_name):
+            raise ValueError(f"Invalid table name: {table_name!r}")
+
+        self.table = table_name
+        self.archive_dir = Path(archive_dir)
+        self.archive_after = archive_after
+        self.ttl = ttl
+        self.summarize = summarize
+        self.summarize_after = summarize_after
+        self.keep_recent = keep_recent
+        self.summarize_retry_after = summarize_retry_after
+        self.batch_size = batch_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.interval = interval
+        self.on_change = on_change or (lambda session_id: None)
+
+        # → Separate engine so the pragmas below never touch the chat's connections.
+        #   restore() runs in the chat path, so it uses the chat's own engine
+        self.chat_engine = engine
+        self.engine = create_engine(engine.url, future=True)
+
+        @event.listens_for(self.engine, "connect")
+        def _set_pragmas(dbapi_conn, _):
+            dbapi_conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._prepared = False
+        self._counts = {}
+        self._summary_failed_at = {}
+        self._archive_lock = threading.Lock()  # → archive / expire / restore of one session at a time
+
+    # -------------------------------
+    # → SETUP
+    # -------------------------------
+
+    def _prepare(self):
+        """
+        One-off setup: WAL mode, activity table and session_id index.
+
+        Until the chat has created its table there is nothing to maintain:
+        _prepared stays False and setup is tried again next tick.
+
+        Never runs VACUUM: that holds the write lock for the whole rewrite,
+        so the switch to incremental auto-vacuum is left to
+        enable_incremental_vacuum(), run offline.
+        """
+        with self.engine.begin() as conn:
+            conn.execute(text("PRAGMA journal_mode = WAL"))
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS session_activity ("
+                " session_id TEXT PRIMARY KEY,"
+                " max_id INTEGER NOT NULL,"
+                " last_seen REAL NOT NULL,"
+                " archived INTEGER NOT NULL DEFAULT 0)"
+            ))
+            has_table = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {"name": self.table}).first() is not None
+            if not has_table:
+                return
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_session_id ON {self.table} (session_id, id)"
+            ))
+            auto_vacuum = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+
+        if auto_vacuum != 2:
+            logger.warning(
+                "auto_vacuum is not INCREMENTAL, so freed pages are not returned to disk; run "
+                "`python session_maintenance.py <db> --enable-incremental-vacuum` while the chat is offline"
+            )
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._prepared = True
+
+    def enable_incremental_vacuum(self):
+        """
+        Switches the database to incremental auto-vacuum with one full VACUUM.
+
+        Offline step: the VACUUM rewrites the whole file under an exclusive
+        lock, so only run it while no chat is using the database.
+        """
+        with self.engine.connect() as conn:
+            if conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+                return False
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+        return True
+
+    # -------------------------------
+    # → TICK
+    # -------------------------------
+
+    def run_once(self):
+        """
+        Runs one full maintenance pass and returns what it did.
+        """
+        stats = {"archived": 0, "expired": 0, "compacted": 0, "summary_failed": 0,
+                 "rows_deleted": 0, "skipped_busy": 0}
+        now = time.time()
+
+        if not self._prepared:
+            try:
+                self._prepare()
+            except OperationalError as exc:
+                logger.debug("maintenance setup skipped: %s", exc)
+                stats["skipped_busy"] += 1
+                return stats
+            if not self._prepared:
+                return stats
+
+        try:
+            self._track_activity(now)
+        except OperationalError:
+            stats["skipped_busy"] += 1
+            return stats
+
+        for step in (self._archive_idle, self._expire_archives, self._compact_long, self._reclaim_space):
+            if self._stop.is_set():
+                break
+            try:
+                step(now, stats)
+            except OperationalError as exc:
+                # → Locked by a chat write: back off and retry next tick
+                logger.debug("maintenance step %s skipped: %s", step.__name__, exc)
+                stats["skipped_busy"] += 1
+
+        return stats
+
+    def _track_activity(self, now):
+        with self.engine.connect() as conn:
+            live = conn.execute(text(
+                f"SELECT session_id, MAX(id), COUNT(*) FROM {self.table} GROUP BY session_id"
+            )).all()
+            known = dict(conn.execute(text(
+                "SELECT session_id, max_id FROM session_activity WHERE archived = 0"
+            )).all())
+
+        self._counts = {session_id: count for session_id, _, count in live}
+
+        # → Only sessions with new messages are written, a batch at a time
+        changed = [(sid, max_id) for sid, max_id, _ in live if known.get(sid) != max_id]
+        for start in range(0, len(changed), self.batch_size):
+            with self.engine.begin() as conn:
+                conn.execute(text(
+                    "INSERT INTO session_activity (session_id, max_id, last_seen, archived)"
+                    " VALUES (:sid, :max_id, :now, 0)"
+                    " ON CONFLICT(session_id) DO UPDATE SET"
+                    "  max_id = excluded.max_id, last_seen = excluded.last_seen, archived = 0"
+                ), [{"sid": sid, "max_id": max_id, "now": now}
+                    for sid, max_id in changed[start:start + self.batch_size]])
+            time.sleep(self.pause)
+
+    def _delete_rows(self, where, params, stats):
+        """
+        Deletes matching rows `batch_size` at a time, pausing between batches.
+        """
+        while not self._stop.is_set():
+            with self.engine.begin() as conn:
+                deleted = conn.execute(text(
+                    f"DELETE FROM {self.table} WHERE id IN"
+                    f" (SELECT id FROM {self.table} WHERE {where} ORDER BY id LIMIT :limit)"
+                ), {**params, "limit": self.batch_size}).rowcount
+            stats["rows_deleted"] += deleted
+            if deleted < self.batch_size:
+                return
+            time.sleep(self.pause)
+
+    # -------------------------------
+    # → ARCHIVE AND EXPIRE
+    # -------------------------------
+
+    def _archive_path(self, session_id):
+        # → Hashed, not sanitized: "a/b" and "a_b" must never share an archive
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return self.archive_dir / f"{digest}.jsonl.zst"
+
+    def _archive_idle(self, now, stats):
+        with self.engine.connect() as conn:
+            idle = conn.execute(text(
+                "SELECT session_id FROM session_activity WHERE archived = 0 AND last_seen < :cutoff"
+            ), {"cutoff": now - self.archive_after}).scalars().all()
+
+        for session_id in idle:
+            if self._stop.is_set():
+                return
+            with self._archive_lock:
+                archived = self._archive_session(session_id, now, stats)
+            if archived:
+                self.on_change(session_id)
+                stats["archived"] += 1
+                time.sleep(self.pause)
+
+    def _archive_session(self, session_id, now, stats):
+        with self.engine.connect() as conn:
+            # → Re-checked under the lock: restore() may have revived the session
+            still_idle = conn.execute(text(
+                "SELECT 1 FROM session_activity"
+                " WHERE session_id = :sid AND archived = 0 AND last_seen < :cutoff"
+            ), {"sid": session_id, "cutoff": now - self.archive_after}).first() is not None
+            rows = conn.execute(text(
+                f"SELECT id, message FROM {self.table} WHERE session_id = :sid ORDER BY id"
+            ), {"sid": session_id}).all() if still_idle else []
+        if not rows:
+            return False
+
+        # → Append a zstd frame per archival; zstd readers decode concatenated frames
+
+        payload = "".join(message + "\n" for _, message in rows).encode("utf-8")
+        with open(self._archive_path(session_id), "ab") as f:
+            f.write(zstandard.ZstdCompressor(level=10).compress(payload))
+
+        last_id = rows[-1][0]
+        self._delete_rows("session_id = :sid AND id <= :last_id",
+                          {"sid": session_id, "last_id": last_id}, stats)
+
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE session_activity SET archived = 1 WHERE session_id = :sid"
+            ), {"sid": session_id})
+        return True
+
+    def _expire_archives(self, now, stats):
+        with self.engine.connect() as conn:
+            expired = conn.execute(text(
+                "SELECT session_id FROM session_activity WHERE archived = 1 AND last_seen < :cutoff"
+            ), {"cutoff": now - self.ttl}).scalars().all()
+
+        for session_id in expired:
+            with self._archive_lock:
+                with self.engine.begin() as conn:
+                    # → Still archived: restore() may have brought it back meanwhile
+                    deleted = conn.execute(text(
+                        "DELETE FROM session_activity WHERE session_id = :sid AND archived = 1"
+                    ), {"sid": session_id}).rowcount
+                if deleted:
+                    self._archive_path(session_id).unlink(missing_ok=True)
+                    stats["expired"] += 1
+
+    def _archive_lines(self, session_id):
+        """
+        Raw `message` column values stored in a session's archive, oldest first.
+        """
+        path = self._archive_path(session_id)
+        if not path.exists():
+            return []
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+        with reader:
+            return [line for line in reader.read().decode("utf-8").splitlines() if line]
+
+    def load_archive(self, session_id):
+        """
+        Returns the archived messages of a session as BaseMessage objects.
+        """
+        return messages_from_dict([json.loads(line) for line in self._archive_lines(session_id)])
+
+    def restore(self, session_id):
+        """
+        Moves an archived session back into message_store; returns True if it did.
+
+        Runs on the chat's own engine and is cheap when the session is not
+        archived (one primary-key lookup). Messages written since archival
+        are kept after the restored ones.
+        """
+        with self._archive_lock:
+            try:
+                with self.chat_engine.connect() as conn:
+                    archived = conn.execute(text(
+                        "SELECT archived FROM session_activity WHERE session_id = :sid"
+                    ), {"sid": session_id}).scalar()
+            except OperationalError as exc:
+                # → Maintenance has not set up its table yet, so nothing is archived
+                if "no such table" not in str(exc.orig):
+                    raise
+                return False
+            if not archived:
+                return False
+
+            lines = self._archive_lines(session_id)
+            with self.chat_engine.begin() as conn:
+                newer = conn.execute(text(
+                    f"SELECT message FROM {self.table} WHERE session_id = :sid ORDER BY id"
+                ), {"sid": session_id}).scalars().all()
+                rows = [{"sid": session_id, "m": message} for message in lines + newer]
+                if newer:
+                    conn.execute(text(f"DELETE FROM {self.table} WHERE session_id = :sid"), {"sid": session_id})
+                if rows:
+                    conn.execute(text(
+                        f"INSERT INTO {self.table} (session_id, message) VALUES (:sid, :m)"
+                    ), rows)
+                conn.execute(text(
+                    "UPDATE session_activity SET archived = 0, last_seen = :now WHERE session_id = :sid"
+                ), {"sid": session_id, "now": time.time()})
+
+            # → Removed only after the rows are committed back
+            self._archive_path(session_id).unlink(missing_ok=True)
+
+        self.on_change(session_id)
+        return True
+
+    # -------------------------------
+    # → SUMMARY COMPACTION
+    # -------------------------------
+
+    def _compact_long(self, now, stats):
+        if self.summarize is None:
+            return
+
+        long_sessions = [
+            sid for sid, count in self._counts.items()
+            if count > self.summarize_after
+            and now - self._summary_failed_at.get(sid, float("-inf")) >= self.summarize_retry_after
+        ]
+        for session_id in long_sessions:
+            if self._stop.is_set():
+                return
+
+            with self.engine.connect() as conn:
+                rows = conn.execute(text(
+                    f"SELECT id, message FROM {self.table} WHERE session_id = :sid ORDER BY id"
+                ), {"sid": session_id}).all()
+            old = rows[:-self.keep_recent] if self.keep_recent else rows
+            if len(old) < 2:
+                continue
+
+            # → The LLM call happens outside any transaction. A failed summary only
+            #   skips this session; it is retried after summarize_retry_after
+            messages = messages_from_dict([json.loads(message) for _, message in old])
+            try:
+                summary = SystemMessage(content=SUMMARY_PREFIX + self.summarize(messages))
+            except Exception:
+                logger.exception("summarizing session %r failed", session_id)
+                self._summary_failed_at[session_id] = now
+                stats["summary_failed"] += 1
+                continue
+            self._summary_failed_at.pop(session_id, None)
+
+            # → Overwrite the oldest row first so ordering by id keeps the summary in
+            #   front; a crash before the deletes only leaves extra rows behind
+            first_id, last_id = old[0][0], old[-1][0]
+            with self.engine.begin() as conn:
+                conn.execute(text(f"UPDATE {self.table} SET message = :m WHERE id = :id"),
+                             {"m": json.dumps(message_to_dict(summary)), "id": first_id})
+
+            self._delete_rows("session_id = :sid AND id > :first_id AND id <= :last_id",
+                              {"sid": session_id, "first_id": first_id, "last_id": last_id}, stats)
+
+            self.on_change(session_id)
+            stats["compacted"] += 1
+            time.sleep(self.pause)
+
+    # -------------------------------
+    # → SPACE RECLAIM
+    # -------------------------------
+
+    def _reclaim_space(self, now, stats):
+        with self.engine.connect() as conn:
+            # → sqlite frees one page per step, so the raw cursor must be drained
+            cursor = conn.connection.cursor()
+            cursor.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})")
+            cursor.fetchall()
+            cursor.close()
+            # → Cheap ANALYZE: only tables whose stats are stale, sampling capped
+            conn.execute(text("PRAGMA analysis_limit = 400"))
+            conn.execute(text("PRAGMA optimize"))
+
+    # -------------------------------
+    # → BACKGROUND THREAD
+    # -------------------------------
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                stats = self.run_once()
+                logger.debug("session maintenance: %s", stats)
+            except Exception:
+                logger.exception("session maintenance failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="session-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.engine.dispose()
+
+# -------------------------------
+# → MAIN ENTRY POINT
+# -------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline maintenance for a chat history database.")
+    parser.add_argument("db", help="SQLite database file, e.g. chat_history.db")
+    parser.add_argument("--archive-dir", help="Archive directory (default: <db dir>/chat_archive, as the chat scripts use)")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Run the one-off VACUUM that enables incremental auto-vacuum (chat must be offline)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    archive_dir = args.archive_dir or Path(args.db).resolve().parent / "chat_archive"
+    maintainer = SessionMaintainer(create_engine(f"sqlite:///{args.db}"), archive_dir=archive_dir)
+    try:
+        if args.enable_incremental_vacuum:
+            changed = maintainer.enable_incremental_vacuum()
+            print("→ auto_vacuum set to INCREMENTAL" if changed else "→ auto_vacuum already INCREMENTAL")
+        print(f"→ Maintenance pass: {maintainer.run_once()}")
+    finally:
+        maintainer.stop()
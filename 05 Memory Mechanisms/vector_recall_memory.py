@@ -0,0 +1,170 @@
+# vector_recall_memory.py
+
+"""
+→ VECTOR RECALL MEMORY
+
+An alternative to ConversationSummaryMemory for very long sessions. Past
+turns are neither replayed in full nor squashed into a lossy summary.
+Each turn is embedded once, when it is saved, into a per-session vector
+index stored next to `message_store` in the same database:
+
+→ [message_store]  → full messages, written by SQLChatMessageHistory
+→ [turn_vectors]   → one row per turn: text + normalized float32 embedding
+
+On every new question the prompt gets:
+→ the top-k most similar earlier turns (vector recall), and
+→ the last few messages verbatim (recent window).
+
+Prompt size stays constant however long the session runs, and a fact from
+turn 3 can still be recalled at turn 3000.
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+from sqlalchemy import text
+from langchain_core.memory import BaseMemory
+from langchain_core.messages import SystemMessage, messages_from_dict
+from langchain_community.chat_message_histories import SQLChatMessageHistory
+
+
+class VectorRecallMemory(BaseMemory):
+    """
+    Retrieval-based chat memory: top-k relevant past turns + a short recent window.
+    """
+
+    engine: Any
+    embeddings: Any
+    session_id: str = "default"
+    k: int = 4                      # → past turns recalled per question
+    recent_messages: int = 6        # → last messages always included verbatim
+    memory_key: str = "history"
+    input_key: str = "input"
+    output_key: str = "response"
+    table_name: str = "message_store"
+
+    # → Per-session index held in memory, loaded once from turn_vectors.
+    #   _vectors grows by doubling; only its first len(_turn_texts) rows are live
+    _history: Any = None
+    _turn_texts: list = []
+    _vectors: Any = None
+    _last_recalled: list = []
+
+    def model_post_init(self, __context):
+        self._history = SQLChatMessageHistory(
+            session_id=self.session_id, connection=self.engine, table_name=self.table_name
+        )
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS turn_vectors ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT NOT NULL,"
+                " turn_text TEXT NOT NULL,"
+                " embedding BLOB NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_turn_vectors_session_id ON turn_vectors (session_id, id)"
+            ))
+        self._load_index()
+
+    @property
+    def memory_variables(self):
+        return [self.memory_key]
+
+    @property
+    def turn_count(self):
+        return len(self._turn_texts)
+
+    @property
+    def last_recalled(self):
+        """
+        Turns recalled for the most recent question.
+        """
+        return self._last_recalled
+
+    # -------------------------------
+    # → INDEX
+    # -------------------------------
+
+    def _load_index(self):
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT turn_text, embedding FROM turn_vectors WHERE session_id = :sid ORDER BY id"
+            ), {"sid": self.session_id}).all()
+
+        self._turn_texts = [turn_text for turn_text, _ in rows]
+        self._vectors = (
+            np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+            if rows else None
+        )
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _add_turn(self, turn_text):
+        vector = self._normalize(self.embeddings.embed_query(turn_text))
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO turn_vectors (session_id, turn_text, embedding) VALUES (:sid, :t, :e)"
+            ), {"sid": self.session_id, "t": turn_text, "e": vector.tobytes()})
+
+        n = len(self._turn_texts)
+        if self._vectors is None:
+            self._vectors = np.empty((16, vector.shape[0]), dtype=np.float32)
+        elif n == self._vectors.shape[0]:
+            self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+        self._vectors[n] = vector
+        self._turn_texts.append(turn_text)
+
+    def recall(self, query):
+        """
+        Returns the k past turns most similar to `query`, oldest first.
+
+        Turns still inside the recent window are skipped; they are sent verbatim anyway.
+        """
+        searchable = len(self._turn_texts) - self.recent_messages // 2
+        if self._vectors is None or searchable <= 0 or self.k <= 0:
+            return []
+
+        scores = self._vectors[:searchable] @ self._normalize(self.embeddings.embed_query(query))
+        top = np.argsort(-scores)[:self.k]
+        return [self._turn_texts[i] for i in sorted(top)]
+
+    def _recent(self):
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                f"SELECT message FROM {self.table_name} WHERE session_id = :sid ORDER BY id DESC LIMIT :n"
+            ), {"sid": self.session_id, "n": self.recent_messages}).scalars().all()
+        return messages_from_dict([json.loads(row) for row in reversed(rows)])
+
+    # -------------------------------
+    # → BaseMemory INTERFACE
+    # -------------------------------
+
+    def load_memory_variables(self, inputs):
+        recalled = self._last_recalled = self.recall(inputs[self.input_key])
+        messages = []
+        if recalled:
+            messages.append(SystemMessage(
+                "Relevant parts of the earlier conversation:\n\n" + "\n\n".join(recalled)
+            ))
+        messages.extend(self._recent())
+        return {self.memory_key: messages}
+
+    def save_context(self, inputs, outputs):
+        user_text = inputs[self.input_key]
+        ai_text = outputs[self.output_key]
+        self._history.add_user_message(user_text)
+        self._history.add_ai_message(ai_text)
+        self._add_turn(f"User: {user_text}\nAssistant: {ai_text}")
+
+    def clear(self):
+        self._history.clear()
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM turn_vectors WHERE session_id = :sid"), {"sid": self.session_id})
+        self._turn_texts = []
+        self._vectors = None
@@ -0,0 +1,79 @@
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.chains import ConversationChain
+
+from vector_recall_memory import VectorRecallMemory
+
+# → Load environment variables from the .env file
+env_path = Path(__file__).resolve().parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+# → Make the shared helpers in the repo root (llm_access.py) importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from llm_access import get_llm_azure, get_embeddings_azure
+
+if not all(os.getenv(name) for name in (
+    "AZURE_OPENAI_API_KEY", "AZURE_OPENAI_API_VERSION",
+    "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_DEPLOYMENT", "AZURE_OPENAI_EMBEDDING_DEPLOYMENT",
+)):
+    print("❌ Missing Azure OpenAI environment variables.")
+    exit(1)
+
+print("✅ Azure OpenAI credentials loaded successfully.")
+
+# → Initialize LLM and embedding model
+llm = get_llm_azure(temperature=0.5)
+embeddings = get_embeddings_azure()
+
+# → Messages and their turn vectors live side by side in one SQLite file
+db_path = Path(__file__).resolve().parent / "vector_memory.db"
+engine = create_engine(f"sqlite:///{db_path}", future=True)
+
+# → Setup vector recall memory: top-4 relevant past turns + last 6 messages
+memory = VectorRecallMemory(
+    engine=engine,
+    embeddings=embeddings,
+    session_id="terminal_user",
+    k=4,
+    recent_messages=6,
+)
+
+# → Prompt with a slot for the recalled turns and the recent window
+prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant. Use the earlier conversation when it is relevant."),
+    MessagesPlaceholder("history"),
+    ("human", "{input}"),
+])
+
+# → Conversation chain using retrieval-based memory
+conversation = ConversationChain(
+    llm=llm,
+    prompt=prompt,
+    memory=memory,
+    verbose=False
+)
+
+# → Terminal Chatbot Loop
+print("\n🤖 Chatbot Initialized with Vector Recall Memory")
+print(f"📚 {memory.turn_count} earlier turns indexed for this session.")
+print("Type 'exit' or 'quit' to end the chat.\n")
+
+while True:
+    user_input = input("👤 You: ")
+
+    if user_input.lower() in ["exit", "quit"]:
+        print("👋 Exiting the chat. Goodbye!")
+        break
+
+    response = conversation.invoke(user_input)
+
+    print(f"\n🔎 Recalled {len(memory.last_recalled)} earlier turn(s)")
+    for turn in memory.last_recalled:
+        print("   •", turn.splitlines()[0])
+
+    print("\n🤖 Assistant:", response['response'])
+    print("-" * 60)
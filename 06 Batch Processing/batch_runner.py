@@ -0,0 +1,378 @@
+# batch_runner.py
+
+"""
+→ OFFLINE BATCH RUNNER FOR BULK PROMPT WORKLOADS
+
+Runs a LangChain chain over every record of a CSV or JSONL file:
+
+→ [Input File (CSV / JSONL)]  → streamed row by row, never loaded whole
+    ↓
+→ [Bounded Worker Pool]       → at most `concurrency` calls in flight
+    ↓
+→ [Retry With Backoff]        → 429s and transient errors retried with jitter
+                                (left entirely to the rate-limited transport
+                                 from llm_access.get_llm_azure when it is used)
+    ↓
+→ [Output JSONL + Checkpoint] → written as each row finishes
+
+If the job crashes, run the same command again: rows recorded in the
+checkpoint are skipped and the job picks up where it stopped.
+
+Usage:
+    python "06 Batch Processing/batch_runner.py" products.csv products_out.jsonl --task products
+    python "06 Batch Processing/batch_runner.py" bios.jsonl bios_out.jsonl --task bios --concurrency 16
+
+Output rows look like:
+    {"row": 12, "input": {...}, "output": "..."}        → success
+    {"row": 13, "input": {...}, "error": "..."}         → gave up after retries
+
+Rows that gave up are recorded as failed in the checkpoint and run again on
+the next resume, so a 429 storm never loses rows for good.
+
+Delivery is at-least-once: a crash between writing a row and saving the
+checkpoint can repeat that row on resume, and a retried failed row appears
+again after its "error" line. Keep the last line per "row" if needed.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from tqdm import tqdm
+
+# → Make the shared helpers in the repo root (llm_access.py) importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# -------------------------------
+# → STEP 1: STREAM INPUT RECORDS
+# -------------------------------
+
+def iter_records(path):
+    """
+    Yields (row_index, record) pairs from a CSV or JSONL file, one at a time.
+    """
+    path = Path(path)
+
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for i, record in enumerate(csv.DictReader(f)):
+                yield i, record
+    else:
+        with open(path, encoding="utf-8") as f:
+            i = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                yield i, json.loads(line)
+                i += 1
+
+
+def count_records(path):
+    """
+    Counts records with a streaming pass so tqdm can show an ETA.
+    """
+    return sum(1 for _ in iter_records(path))
+
+# -------------------------------
+# → STEP 2: CHECKPOINTING
+# -------------------------------
+
+class Checkpoint:
+    """
+    Tracks finished rows as a watermark plus the few rows finished out of order.
+
+    Every row below `watermark` has been processed; `done` only holds processed
+    rows above it. Rows that ran out of retries are kept in `failed` so a
+    resumed job runs them again. The checkpoint stays small no matter how large
+    the input is.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.watermark = 0
+        self.done = set()
+        self.failed = set()
+
+        if self.path.exists():
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+            self.watermark = state["watermark"]
+            self.done = set(state["done"])
+            self.failed = set(state.get("failed", []))
+
+    def is_done(self, row):
+        if row in self.failed:
+            return False
+        return row < self.watermark or row in self.done
+
+    def done_count(self):
+        """
+        Rows a resumed job will skip. Failed rows are always below the
+        watermark or in `done`, so they are subtracted once.
+        """
+        return self.watermark + len(self.done) - len(self.failed)
+
+    def mark_done(self, row, failed=False):
+        if failed:
+            self.failed.add(row)
+        else:
+            self.failed.discard(row)
+
+        if row >= self.watermark:
+            self.done.add(row)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self):
+        # → Write to a temp file and rename so a crash never leaves half a checkpoint
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        state = {"watermark": self.watermark, "done": sorted(self.done), "failed": sorted(self.failed)}
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+# -------------------------------
+# → STEP 3: RATE-LIMIT-AWARE RETRIES
+# -------------------------------
+
+# → Exception class names worth retrying (openai / httpx), matched by name
+#   so this module does not need to import either library
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "ConnectError",
+    "ReadTimeout",
+}
+
+
+def is_rate_limit(exc):
+    return getattr(exc, "status_code", None) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def is_retryable(exc, retry_rate_limits=True):
+    if is_rate_limit(exc):
+        return retry_rate_limits
+    if getattr(exc, "status_code", None) in (500, 502, 503, 504):
+        return True
+    return type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def retry_delay(exc, attempt, base_delay, max_delay):
+    """
+    Honors the server's retry-after header when present, else full-jitter backoff.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+
+    if retry_after:
+        try:
+            return min(float(retry_after), max_delay) + random.uniform(0, base_delay)
+        except ValueError:
+            pass
+
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def invoke_with_retries(chain, record, max_retries=5, base_delay=1.0, max_delay=60.0,
+                        retry_rate_limits=True, retry_budget=None):
+    """
+    Invokes `chain`, retrying transient errors.
+
+    retry_rate_limits=False leaves 429s to a transport that already retries
+    them (rate_limiter.RateLimitedTransport). With `retry_budget` (a
+    rate_limiter.RetryBudget) every retry spends from that shared budget,
+    so row-level retries and transport retries draw on the same pool.
+    """
+    attempt = 0
+    while True:
+        try:
+            return chain.invoke(record)
+        except Exception as exc:
+            if attempt >= max_retries or not is_retryable(exc, retry_rate_limits):
+                raise
+            if retry_budget is not None and not retry_budget.try_spend():
+                raise
+            time.sleep(retry_delay(exc, attempt, base_delay, max_delay))
+            attempt += 1
+
+
+def to_jsonable(result):
+    """
+    Flattens chain output (AIMessage, str or dict of either) into plain JSON.
+    """
+    if hasattr(result, "content"):
+        return result.content
+    if isinstance(result, dict):
+        return {key: to_jsonable(value) for key, value in result.items()}
+    return result
+
+# -------------------------------
+# → STEP 4: BATCH LOOP
+# -------------------------------
+
+def run_batch(
+    chain,
+    input_path,
+    output_path,
+    checkpoint_path=None,
+    concurrency=8,
+    max_retries=5,
+    show_progress=True,
+    retry_rate_limits=True,
+    retry_budget=None,
+):
+    """
+    Runs `chain` over every record in `input_path`, appending results to `output_path`.
+
+    Only `2 * concurrency` records are ever held in memory, and the checkpoint
+    is saved after every finished row so the job can resume after a crash.
+    `retry_rate_limits` and `retry_budget` are passed to invoke_with_retries.
+    """
+    checkpoint = Checkpoint(checkpoint_path or str(output_path) + ".ckpt")
+    max_in_flight = concurrency * 2
+    stats = {"ok": 0, "failed": 0, "skipped": 0}
+
+    # → Rows finished by an earlier run start the bar as `initial`, so the rate
+    #   and ETA only count rows processed by this run
+    total = count_records(input_path) if show_progress else None
+    progress = tqdm(total=total, initial=checkpoint.done_count(), unit="row",
+                    dynamic_ncols=True, disable=not show_progress)
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+
+        in_flight = {}
+
+        def drain(return_when):
+            finished, _ = wait(in_flight, return_when=return_when)
+            for future in finished:
+                row, record = in_flight.pop(future)
+                line = {"row": row, "input": record}
+                failed = False
+                try:
+                    line["output"] = to_jsonable(future.result())
+                    stats["ok"] += 1
+                except Exception as exc:
+                    line["error"] = f"{type(exc).__name__}: {exc}"
+                    stats["failed"] += 1
+                    failed = True
+
+                # → Output first, checkpoint second: a crash in between repeats a row, never loses one
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+                out.flush()
+                checkpoint.mark_done(row, failed=failed)
+                checkpoint.save()
+                progress.update(1)
+
+            progress.set_postfix(ok=stats["ok"], failed=stats["failed"])
+
+        for row, record in iter_records(input_path):
+            if checkpoint.is_done(row):
+                stats["skipped"] += 1
+                continue
+
+            if len(in_flight) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+
+            future = pool.submit(
+                invoke_with_retries, chain, record, max_retries,
+                retry_rate_limits=retry_rate_limits, retry_budget=retry_budget,
+            )
+            in_flight[future] = (row, record)
+
+        while in_flight:
+            drain(FIRST_COMPLETED)
+
+    progress.close()
+    return stats
+
+# -------------------------------
+# → STEP 5: EXAMPLE CHAINS
+# -------------------------------
+
+def build_product_chain(llm):
+    """
+    Same prompt as 03 Propmt-Chains/llm_chain.py; expects a "product" column.
+    """
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+
+    prompt = PromptTemplate.from_template(
+        "Write a short, engaging e-commerce product description for a {product} in bullets. "
+        "Keep it under 50 words."
+    )
+    return prompt | llm | StrOutputParser()
+
+
+def build_bio_chain(llm):
+    """
+    Same three steps as 03 Propmt-Chains/sequential_chain.py; expects a "bio" column.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.runnables import RunnablePassthrough
+
+    headline = ChatPromptTemplate.from_template(
+        "Create a short, catchy LinkedIn-style professional headline for this bio:\n\n{bio}"
+    ) | llm | StrOutputParser()
+    pitch = ChatPromptTemplate.from_template(
+        "Summarize this professional bio into a compelling 1-paragraph pitch:\n\n{bio}"
+    ) | llm | StrOutputParser()
+    job_message = ChatPromptTemplate.from_template(
+        "Use the following pitch to write a short job application message:\n\n{pitch}"
+    ) | llm | StrOutputParser()
+
+    return (
+        RunnablePassthrough.assign(headline=headline, pitch=pitch)
+        | RunnablePassthrough.assign(job_message=job_message)
+        | (lambda ctx: {k: ctx[k] for k in ("headline", "pitch", "job_message")})
+    )
+
+
+TASKS = {
+    "products": build_product_chain,
+    "bios": build_bio_chain,
+}
+
+# -------------------------------
+# → MAIN ENTRY POINT
+# -------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a prompt chain over a CSV/JSONL file.")
+    parser.add_argument("input", help="Input .csv or .jsonl file")
+    parser.add_argument("output", help="Output .jsonl file (appended to)")
+    parser.add_argument("--task", choices=sorted(TASKS), default="products")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--ollama", action="store_true", help="Use local Ollama instead of Azure")
+    args = parser.parse_args()
+
+    from llm_access import get_llm_azure, get_llm_ollama
+    from rate_limiter import RETRY_BUDGET
+
+    llm = get_llm_ollama() if args.ollama else get_llm_azure(max_retries=args.max_retries)
+    chain = TASKS[args.task](llm)
+
+    stats = run_batch(
+        chain,
+        args.input,
+        args.output,
+        checkpoint_path=args.checkpoint,
+        concurrency=args.concurrency,
+        # → Azure calls already retry 429s, 5xx and connection errors in the
+        #   rate-limited transport, so rows are only retried here for Ollama
+        max_retries=args.max_retries if args.ollama else 0,
+        retry_rate_limits=args.ollama,
+        retry_budget=RETRY_BUDGET,
+    )
+    print(f"→ Done. ok={stats['ok']} failed={stats['failed']} skipped={stats['skipped']}")
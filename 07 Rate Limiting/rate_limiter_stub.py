@@ -0,0 +1,233 @@
+# rate_limiter_stub.py
+
+"""
+→ RATE LIMITER TESTS AGAINST A LOCAL 429 STUB
+
+No Azure credentials needed: this script starts a tiny HTTP server on
+localhost that pretends to be an Azure OpenAI deployment and answers with
+429 + retry-after until told otherwise.
+
+→ 1. Run from the repo root:
+       python "07 Rate Limiting/rate_limiter_stub.py"
+
+→ 2. Every test prints PASSED or raises an AssertionError.
+"""
+
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# → Make the shared helpers in the repo root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from rate_limiter import (
+    AdaptiveRateLimiter,
+    RetryBudget,
+    RateLimitedTransport,
+    AsyncRateLimitedTransport,
+)
+
+# -------------------------------
+# → LOCAL STUB SERVER
+# -------------------------------
+
+class StubState:
+    """
+    Controls how many 429s the stub returns before it starts answering.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset(throttle_count=0)
+
+    def reset(self, throttle_count, retry_after="0.2"):
+        with self.lock:
+            self.throttle_count = throttle_count
+            self.retry_after = retry_after
+            self.request_times = []
+
+
+STATE = StubState()
+
+COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "Hello from the stub."},
+        "finish_reason": "stop",
+    }],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+
+        with STATE.lock:
+            STATE.request_times.append(time.monotonic())
+            throttled = STATE.throttle_count > 0
+            if throttled:
+                STATE.throttle_count -= 1
+
+        if throttled:
+            body = json.dumps({"error": {"code": "429", "message": "Rate limit reached."}}).encode()
+            self.send_response(429)
+            self.send_header("retry-after", STATE.retry_after)
+            self.send_header("x-ratelimit-remaining-requests", "0")
+        else:
+            body = json.dumps(COMPLETION).encode()
+            self.send_response(200)
+            self.send_header("x-ratelimit-remaining-requests", "100")
+            self.send_header("x-ratelimit-remaining-tokens", "100000")
+
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def make_client(limiter, budget):
+    return httpx.Client(transport=RateLimitedTransport(limiter, budget))
+
+
+def post(client, base_url):
+    return client.post(f"{base_url}/chat/completions", json={"messages": [{"role": "user", "content": "Hi"}]})
+
+# -------------------------------
+# → TESTS
+# -------------------------------
+
+def test_retry_after_is_honored(base_url):
+    STATE.reset(throttle_count=2, retry_after="0.3")
+    limiter = AdaptiveRateLimiter(rpm=6000, tpm=1_000_000)
+
+    with make_client(limiter, RetryBudget()) as client:
+        start = time.monotonic()
+        response = post(client, base_url)
+        elapsed = time.monotonic() - start
+
+    assert response.status_code == 200, response.status_code
+    assert len(STATE.request_times) == 3
+    assert elapsed >= 0.6, f"retry-after ignored, finished in {elapsed:.2f}s"
+    assert limiter.fraction < 1.0, "rate did not back off after 429s"
+
+
+def test_retry_budget_stops_retries(base_url):
+    STATE.reset(throttle_count=100, retry_after="0")
+    limiter = AdaptiveRateLimiter(rpm=6000, tpm=1_000_000)
+    budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_balance=2.0)
+
+    with make_client(limiter, budget) as client:
+        response = post(client, base_url)
+
+    assert response.status_code == 429
+    assert len(STATE.request_times) == 3, "expected 1 request + 2 budgeted retries"
+
+
+def test_no_thundering_herd(base_url):
+    STATE.reset(throttle_count=1, retry_after="0.5")
+    limiter = AdaptiveRateLimiter(rpm=6000, tpm=1_000_000)
+    budget = RetryBudget()
+
+    # → First caller trips the 429 and blocks the whole deployment
+    with make_client(limiter, budget) as client:
+        threads = [threading.Thread(target=post, args=(client, base_url)) for _ in range(8)]
+        threads[0].start()
+        time.sleep(0.1)
+        for t in threads[1:]:
+            t.start()
+        for t in threads:
+            t.join()
+
+    first = STATE.request_times[0]
+    during_block = [t for t in STATE.request_times[1:] if t - first < 0.45]
+    assert not during_block, f"{len(during_block)} requests sent while blocked by retry-after"
+
+
+def test_rpm_bucket_paces_requests(base_url):
+    STATE.reset(throttle_count=0)
+    limiter = AdaptiveRateLimiter(rpm=120, tpm=1_000_000)  # → 2 requests / second
+    limiter.requests.tokens = 0
+
+    with make_client(limiter, RetryBudget()) as client:
+        start = time.monotonic()
+        for _ in range(3):
+            post(client, base_url)
+        elapsed = time.monotonic() - start
+
+    assert elapsed >= 1.4, f"3 requests at 2 rps took only {elapsed:.2f}s"
+
+
+def test_async_transport(base_url):
+    import asyncio
+
+    STATE.reset(throttle_count=1, retry_after="0.1")
+    limiter = AdaptiveRateLimiter(rpm=6000, tpm=1_000_000)
+
+    async def run():
+        transport = AsyncRateLimitedTransport(limiter, RetryBudget())
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.post(f"{base_url}/chat/completions", json={"messages": []})
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert len(STATE.request_times) == 2
+
+
+def test_llm_factory_end_to_end(base_url):
+    import os
+    from llm_access import get_llm_azure
+
+    STATE.reset(throttle_count=2, retry_after="0.1")
+    os.environ.update({
+        "AZURE_OPENAI_API_KEY": "stub-key",
+        "AZURE_OPENAI_API_VERSION": "2024-06-01",
+        "AZURE_OPENAI_ENDPOINT": base_url,
+        "AZURE_OPENAI_DEPLOYMENT": "stub-deployment",
+    })
+
+    llm = get_llm_azure(rpm=6000, tpm=1_000_000)
+    result = llm.invoke("Hi")
+
+    assert result.content == "Hello from the stub."
+    assert len(STATE.request_times) == 3
+
+# -------------------------------
+# → MAIN ENTRY POINT
+# -------------------------------
+
+if __name__ == "__main__":
+    server, base_url = start_stub()
+    tests = [
+        test_retry_after_is_honored,
+        test_retry_budget_stops_retries,
+        test_no_thundering_herd,
+        test_rpm_bucket_paces_requests,
+        test_async_transport,
+        test_llm_factory_end_to_end,
+    ]
+
+    try:
+        for test in tests:
+            test(base_url)
+            print(f"→ {test.__name__}: PASSED")
+    finally:
+        server.shutdown()
@@ -0,0 +1,179 @@
+# compression_benchmark.py
+
+"""
+→ CONTEXT COMPRESSION BENCHMARK
+
+Builds a long synthetic conversation: a few facts planted early, buried
+under repeated and near-duplicate filler turns, plus retrieved chunks that
+overlap heavily. Each question is answered twice, once with the raw
+prompt and once with the compressed one:
+
+→ [Raw Prompt]        → history + context exactly as stored
+→ [Compressed Prompt] → ContextCompressor (dedupe + BM25 + token budgets)
+
+Reported per mode:
+    prompt tokens, compression time, LLM latency, answer quality
+    (quality = expected fact appears in the answer) and facts kept
+    (expected fact still appears in the prompt). The facts only exist in the
+    history, so both columns measure what history compression costs.
+
+Usage:
+    python "08 Context Compression/compression_benchmark.py" --offline   # no LLM, tokens + fact retention only
+    python "08 Context Compression/compression_benchmark.py"             # Azure OpenAI via llm_access.py
+    python "08 Context Compression/compression_benchmark.py" --ollama    # local Ollama
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.output_parsers import StrOutputParser
+
+# → Make the shared helpers in the repo root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from context_compression import ContextCompressor, count_tokens
+
+# -------------------------------
+# → STEP 1: SYNTHETIC WORKLOAD
+# -------------------------------
+
+FACTS = [
+    ("My name is Zubair and my email is zubair@example.com.", "What's my name?", "zubair"),
+    ("My favourite programming language is Rust.", "Which programming language do I like best?", "rust"),
+    ("I live in Lahore and work remotely.", "Which city do I live in?", "lahore"),
+]
+
+FILLER = [
+    ("Can you tell me a fun fact about the ocean?",
+     "Sure! The ocean covers about 71 percent of the Earth's surface and holds most of its water."),
+    ("What is a good way to stay productive?",
+     "Try time-boxing your work, taking short breaks, and keeping a single prioritized task list."),
+    ("Explain what an API is in one sentence.",
+     "An API is a contract that lets one piece of software request data or actions from another."),
+]
+
+# → Related to the questions but never containing an expected answer, so
+#   "facts kept" and "quality" only measure what history compression keeps
+CHUNKS = [
+    "A new engineer joined the platform team in 2021 and leads the infrastructure group.",
+    "A new engineer joined the platform team in 2021 and leads the infrastructure group!",
+    "The platform team owns CI/CD pipelines, Kubernetes clusters and monitoring.",
+    "Punjab is the most populous province of Pakistan and many engineers work remotely there.",
+    "Systems programming languages focus on memory safety and performance.",
+    "The office cafeteria serves lunch between 12 and 2 pm on weekdays.",
+]
+
+
+def build_history(turns, seed=7):
+    rng = random.Random(seed)
+    history = []
+    for fact, _, _ in FACTS:
+        history += [HumanMessage(fact), AIMessage("Got it, I'll remember that.")]
+    for _ in range(turns):
+        question, answer = rng.choice(FILLER)
+        history += [HumanMessage(question), AIMessage(answer)]
+    return history
+
+
+def build_context(copies):
+    return [chunk for _ in range(copies) for chunk in CHUNKS]
+
+# -------------------------------
+# → STEP 2: PROMPT
+# -------------------------------
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant. Use the context if relevant.\n\nContext:\n{context}"),
+    MessagesPlaceholder("history"),
+    ("human", "{input}"),
+])
+
+
+def prompt_tokens(inputs):
+    return sum(count_tokens(m.content) for m in prompt.invoke(inputs).to_messages())
+
+
+def prompt_text(inputs):
+    return " ".join(m.content for m in prompt.invoke(inputs).to_messages()).lower()
+
+# -------------------------------
+# → STEP 3: RUN BOTH MODES
+# -------------------------------
+
+def run(llm, turns, copies, compressor):
+    history = build_history(turns)
+    context = build_context(copies)
+    results = {"raw": [], "compressed": []}
+
+    for _, question, expected in FACTS:
+        raw_inputs = {"input": question, "history": history, "context": "\n\n".join(context)}
+
+        start = time.perf_counter()
+        sections, report = compressor.compress(question=question, history=history, context=context)
+        compress_ms = (time.perf_counter() - start) * 1000
+        compressed_inputs = {
+            "input": sections["question"],
+            "history": sections["history"],
+            "context": "\n\n".join(sections["context"]),
+        }
+
+        for mode, inputs in (("raw", raw_inputs), ("compressed", compressed_inputs)):
+            row = {
+                "tokens": prompt_tokens(inputs),
+                "compress_ms": compress_ms if mode == "compressed" else 0.0,
+                "fact_in_prompt": expected in prompt_text(inputs),
+            }
+            if llm is not None:
+                start = time.perf_counter()
+                answer = (prompt | llm | StrOutputParser()).invoke(inputs)
+                row["latency_s"] = time.perf_counter() - start
+                row["correct"] = expected in answer.lower()
+            results[mode].append(row)
+
+    return results
+
+
+def summarize(results):
+    print(f"\n{'mode':<12}{'tokens':>10}{'compress ms':>14}{'latency s':>12}{'quality':>10}{'facts kept':>12}")
+    for mode, rows in results.items():
+        n = len(rows)
+        tokens = sum(r["tokens"] for r in rows) / n
+        compress_ms = sum(r["compress_ms"] for r in rows) / n
+        kept = sum(r["fact_in_prompt"] for r in rows) / n
+        if "latency_s" in rows[0]:
+            latency = f"{sum(r['latency_s'] for r in rows) / n:.2f}"
+            quality = f"{sum(r['correct'] for r in rows) / n:.0%}"
+        else:
+            latency = quality = "-"
+        print(f"{mode:<12}{tokens:>10.0f}{compress_ms:>14.1f}{latency:>12}{quality:>10}{kept:>12.0%}")
+
+    raw = sum(r["tokens"] for r in results["raw"])
+    compressed = sum(r["tokens"] for r in results["compressed"])
+    print(f"\n→ Prompt tokens saved: {raw - compressed} ({1 - compressed / raw:.0%})")
+
+# -------------------------------
+# → MAIN ENTRY POINT
+# -------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark context compression.")
+    parser.add_argument("--turns", type=int, default=200, help="Filler turns after the planted facts")
+    parser.add_argument("--copies", type=int, default=3, help="Times each retrieved chunk is repeated")
+    parser.add_argument("--history-budget", type=int, default=800)
+    parser.add_argument("--context-budget", type=int, default=300)
+    parser.add_argument("--offline", action="store_true", help="Skip LLM calls")
+    parser.add_argument("--ollama", action="store_true", help="Use local Ollama instead of Azure")
+    args = parser.parse_args()
+
+    llm = None
+    if not args.offline:
+        from llm_access import get_llm_azure, get_llm_ollama
+        llm = get_llm_ollama() if args.ollama else get_llm_azure(temperature=0)
+
+    compressor = ContextCompressor(budgets={"history": args.history_budget, "context": args.context_budget})
+    summarize(run(llm, args.turns, args.copies, compressor))
@@ -0,0 +1,307 @@
+# agent_executor.py
+
+"""
+→ TOOL-CALLING AGENT EXECUTOR
+
+Runs a tool-calling loop on any chat model from llm_access.py:
+
+→ [Model Turn]        → llm.bind_tools(tools) decides which tools to call
+    ↓
+→ [Parallel Tools]    → every tool call from that turn runs at once
+                        (async tools on the event loop, blocking tools in a thread pool)
+    ↓
+→ [Tool Result Cache] → idempotent tools are memoized on disk with a per-tool TTL
+    ↓
+→ [Next Model Turn]   → until the model answers without calling tools
+
+Each step (model turn + its tools) is capped at `step_timeout` seconds;
+tools still running at the deadline are cancelled and reported to the model
+as timed out. A model turn past the deadline ends the run with
+`timed_out=True`. Every run returns a timeline of model time vs tool time.
+
+run() drives every call on one event loop owned by the executor, so async
+HTTP clients shared by the model (llm_access.get_llm_azure) stay usable
+across runs. Inside async code, await arun() instead; do not mix run() with
+asyncio.run() on the same shared client.
+"""
+
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.tools import BaseTool
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+# -------------------------------
+# → STEP 1: TOOL POLICIES
+# -------------------------------
+
+@dataclass
+class ToolPolicy:
+    """
+    Caching rules for one tool. Only idempotent tools with a TTL are cached.
+    """
+    idempotent: bool = False
+    ttl: float = 0.0  # → seconds a cached result stays valid
+
+    @property
+    def cacheable(self):
+        return self.idempotent and self.ttl > 0
+
+
+def is_async_tool(tool):
+    """
+    True when a tool has a real async implementation to run on the event loop.
+
+    @tool / StructuredTool expose it as `coroutine`; BaseTool subclasses by
+    overriding _arun (the default _arun just runs _run in a thread).
+    """
+    if hasattr(tool, "coroutine"):
+        return tool.coroutine is not None
+    return type(tool)._arun is not BaseTool._arun
+
+# -------------------------------
+# → STEP 2: PERSISTENT TOOL CACHE
+# -------------------------------
+
+class ToolResultCache:
+    """
+    SQLite-backed memo of tool results, keyed by tool name + canonical JSON args.
+
+    get() returns MISS rather than None on a miss, so a tool that returned
+    None is still a cache hit.
+    """
+
+    MISS = object()
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            " tool TEXT NOT NULL, key TEXT NOT NULL, result TEXT NOT NULL, expires REAL NOT NULL,"
+            " PRIMARY KEY (tool, key))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(args):
+        canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, tool, args):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, expires FROM tool_cache WHERE tool = ? AND key = ?",
+                (tool, self.make_key(args)),
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return self.MISS
+        return json.loads(row[0])
+
+    def put(self, tool, args, result, ttl):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (tool, key, result, expires) VALUES (?, ?, ?, ?)",
+                (tool, self.make_key(args), json.dumps(result, default=str), time.time() + ttl),
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache WHERE expires < ?", (time.time(),))
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+# -------------------------------
+# → STEP 3: RUN TIMELINE
+# -------------------------------
+
+@dataclass
+class TimelineEvent:
+    step: int
+    kind: str         # → "model" or "tool"
+    name: str
+    start: float      # → seconds since the run started
+    end: float
+    status: str = "ok"  # → ok / cached / error / timeout
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+@dataclass
+class AgentRun:
+    answer: str
+    messages: list
+    timeline: list = field(default_factory=list)
+    timed_out: bool = False  # → a model turn exceeded step_timeout
+
+    @property
+    def model_time(self):
+        return sum(e.duration for e in self.timeline if e.kind == "model")
+
+    @property
+    def tool_time(self):
+        """
+        Summed tool durations; larger than the wall time they took when tools overlap.
+        """
+        return sum(e.duration for e in self.timeline if e.kind == "tool")
+
+    @property
+    def wall_time(self):
+        return max((e.end for e in self.timeline), default=0.0)
+
+    def print_timeline(self):
+        print(f"\n{'step':<6}{'kind':<7}{'name':<24}{'start':>8}{'end':>8}{'secs':>8}  status")
+        for e in self.timeline:
+            print(f"{e.step:<6}{e.kind:<7}{e.name:<24}{e.start:>8.2f}{e.end:>8.2f}{e.duration:>8.2f}  {e.status}")
+        print(
+            f"\n→ wall {self.wall_time:.2f}s | model {self.model_time:.2f}s | "
+            f"tools {self.tool_time:.2f}s (summed)"
+        )
+
+# -------------------------------
+# → STEP 4: EXECUTOR
+# -------------------------------
+
+class AgentExecutor:
+    """
+    Tool-calling agent loop with parallel tool execution and cached results.
+    """
+
+    def __init__(
+        self,
+        llm,
+        tools,
+        policies=None,
+        system_prompt=None,
+        cache_path=None,
+        max_steps=8,
+        step_timeout=60.0,
+        max_workers=8,
+    ):
+        self.llm = llm.bind_tools(tools)
+        self.tools = {t.name: t for t in tools}
+        self.policies = policies or {}
+        self.system_prompt = system_prompt
+        self.cache = ToolResultCache(cache_path or Path(__file__).resolve().parent / "tool_cache.db")
+        self.max_steps = max_steps
+        self.step_timeout = step_timeout
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tool")
+        self._loop = asyncio.new_event_loop()
+
+    async def _call_tool(self, call, step, t0, timeline):
+        name, args = call["name"], call["args"]
+        policy = self.policies.get(name, ToolPolicy())
+        start = time.perf_counter() - t0
+
+        def record(status):
+            timeline.append(TimelineEvent(step, "tool", name, start, time.perf_counter() - t0, status))
+
+        tool = self.tools.get(name)
+        if tool is None:
+            record("error")
+            return f"Error: unknown tool {name!r}", "error"
+
+        loop = asyncio.get_running_loop()
+        if policy.cacheable:
+            cached = await loop.run_in_executor(self.pool, self.cache.get, name, args)
+            if cached is not ToolResultCache.MISS:
+                record("cached")
+                return cached, "success"
+
+        try:
+            if is_async_tool(tool):
+                result = await tool.ainvoke(args)
+            else:
+                result = await loop.run_in_executor(self.pool, tool.invoke, args)
+        except asyncio.CancelledError:
+            record("timeout")
+            raise
+        except Exception as exc:
+            record("error")
+            return f"Error: {type(exc).__name__}: {exc}", "error"
+
+        # → SQLite write + commit off the event loop, like the read above
+        if policy.cacheable:
+            await loop.run_in_executor(self.pool, self.cache.put, name, args, result, policy.ttl)
+        record("ok")
+        return result, "success"
+
+    async def _run_tools(self, tool_calls, step, t0, deadline, timeline):
+        tasks = [asyncio.create_task(self._call_tool(call, step, t0, timeline)) for call in tool_calls]
+        remaining = max(0.0, deadline - time.perf_counter())
+        done, pending = await asyncio.wait(tasks, timeout=remaining)
+
+        # → Blocking tools in the thread pool keep running, but their results are dropped
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for call, task in zip(tool_calls, tasks):
+            if task in done:
+                content, status = task.result()
+            else:
+                content, status = f"Error: tool {call['name']!r} timed out", "error"
+            if not isinstance(content, str):
+                content = json.dumps(content, default=str)
+            results.append(ToolMessage(content=content, tool_call_id=call["id"], name=call["name"], status=status))
+        return results
+
+    async def arun(self, question):
+        messages = [SystemMessage(self.system_prompt)] if self.system_prompt else []
+        messages.append(HumanMessage(question))
+        timeline = []
+        t0 = time.perf_counter()
+
+        for step in range(1, self.max_steps + 1):
+            deadline = time.perf_counter() + self.step_timeout
+
+            start = time.perf_counter() - t0
+            try:
+                ai_message = await asyncio.wait_for(self.llm.ainvoke(messages), timeout=self.step_timeout)
+            except asyncio.TimeoutError:
+                timeline.append(TimelineEvent(step, "model", "llm", start, time.perf_counter() - t0, "timeout"))
+                return AgentRun(
+                    answer=f"Timed out: model turn in step {step} exceeded {self.step_timeout}s.",
+                    messages=messages,
+                    timeline=timeline,
+                    timed_out=True,
+                )
+            timeline.append(TimelineEvent(step, "model", "llm", start, time.perf_counter() - t0))
+            messages.append(ai_message)
+
+            if not ai_message.tool_calls:
+                return AgentRun(answer=ai_message.content, messages=messages, timeline=timeline)
+
+            messages.extend(await self._run_tools(ai_message.tool_calls, step, t0, deadline, timeline))
+
+        return AgentRun(
+            answer=f"Stopped after {self.max_steps} steps without a final answer.",
+            messages=messages,
+            timeline=timeline,
+        )
+
+    def run(self, question):
+        """
+        Blocking wrapper around arun(), always on the executor's own event loop.
+        """
+        return self._loop.run_until_complete(self.arun(question))
+
+    def close(self):
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.cache.close()
@@ -0,0 +1,86 @@
+# tool_agent_demo.py
+
+"""
+→ TOOL AGENT DEMO
+
+Asks a question that needs three independent lookups. The model requests
+them in one turn, AgentExecutor runs them in parallel, and the second run
+of the same question is served from the tool cache.
+
+→ Run from the repo root:
+       python "09 Agents/tool_agent_demo.py"
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+from langchain_core.tools import tool
+
+from agent_executor import AgentExecutor, ToolPolicy
+
+# → Make the shared helpers in the repo root (llm_access.py) importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from llm_access import get_llm_azure
+
+# -------------------------------
+# → STEP 1: DEFINE TOOLS
+# -------------------------------
+
+@tool
+def get_weather(city: str) -> str:
+    """Returns the current weather for a city."""
+    time.sleep(1.0)  # → Simulates a slow blocking HTTP call
+    return f"{city}: 31°C, clear skies"
+
+
+@tool
+async def convert_currency(amount: float, source: str, target: str) -> str:
+    """Converts an amount between two currencies."""
+    await asyncio.sleep(0.5)  # → Simulates an async API call
+    rates = {("USD", "PKR"): 278.5, ("EUR", "PKR"): 301.2}
+    rate = rates.get((source.upper(), target.upper()), 1.0)
+    return f"{amount} {source.upper()} = {amount * rate:.2f} {target.upper()}"
+
+
+@tool
+def create_ticket(summary: str) -> str:
+    """Opens a helpdesk ticket. Not idempotent: each call creates a new ticket."""
+    time.sleep(0.3)
+    return f"Ticket #{int(time.time()) % 10000} created: {summary}"
+
+# -------------------------------
+# → STEP 2: CACHING POLICIES
+# -------------------------------
+
+policies = {
+    "get_weather": ToolPolicy(idempotent=True, ttl=600),
+    "convert_currency": ToolPolicy(idempotent=True, ttl=3600),
+    "create_ticket": ToolPolicy(idempotent=False),
+}
+
+# -------------------------------
+# → STEP 3: RUN THE AGENT
+# -------------------------------
+
+if __name__ == "__main__":
+    agent = AgentExecutor(
+        llm=get_llm_azure(temperature=0),
+        tools=[get_weather, convert_currency, create_ticket],
+        policies=policies,
+        system_prompt="You are a helpful assistant. Call independent tools in the same turn.",
+        step_timeout=30,
+    )
+
+    question = "What's the weather in Lahore and in Karachi, and how much is 100 USD in PKR?"
+
+    # → Both runs share the agent's event loop, so the model's pooled async
+    #   HTTP connections from the first run are still valid in the second
+    for attempt in ("cold cache", "warm cache"):
+        run = agent.run(question)
+        print(f"\n→ [{attempt}] {run.answer}")
+        run.print_timeline()
+
+    agent.close()
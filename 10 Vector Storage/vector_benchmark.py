@@ -0,0 +1,116 @@
+# vector_benchmark.py
+
+"""
+→ QUANTIZED VECTOR STORE BENCHMARK
+
+Compares QuantizedVectorStore (vector_store.py) with the plain float32
+baseline, meaning every embedding held in one in-RAM numpy array:
+
+→ [float32 baseline] → exact brute-force search, defines the ground truth
+→ [int8 / float16]   → memory-mapped quantized search, with and without
+                       exact float32 rescoring of the top candidates
+
+Reported per mode:
+    recall@k against the exact baseline, queries per second, and bytes
+    needed in RAM for the scan (the quantized codes) vs on disk in total.
+
+Usage:
+    python "10 Vector Storage/vector_benchmark.py"
+    python "10 Vector Storage/vector_benchmark.py" --count 1000000 --dim 768
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# → Make the shared helpers in the repo root importable
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from vector_store import QuantizedVectorStore
+
+# -------------------------------
+# → STEP 1: SYNTHETIC EMBEDDINGS
+# -------------------------------
+
+def make_embeddings(count, dim, clusters=256, seed=0):
+    """
+    Clustered random vectors, closer to real embeddings than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+# -------------------------------
+# → STEP 2: BASELINE AND MEASUREMENT
+# -------------------------------
+
+def exact_search(vectors, queries, k, batch=64):
+    ids = []
+    for start in range(0, len(queries), batch):
+        scores = queries[start:start + batch] @ vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        ids.append(np.take_along_axis(top, order, axis=1))
+    return np.concatenate(ids)
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def timed(fn, n_queries):
+    start = time.perf_counter()
+    result = fn()
+    return result, n_queries / (time.perf_counter() - start)
+
+# -------------------------------
+# → MAIN ENTRY POINT
+# -------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector storage.")
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=64, help="Queries searched together")
+    args = parser.parse_args()
+
+    print(f"→ Generating {args.count:,} x {args.dim} embeddings...")
+    vectors = make_embeddings(args.count, args.dim)
+    queries = make_embeddings(args.queries, args.dim, seed=1)
+
+    truth, base_qps = timed(lambda: exact_search(vectors, queries, args.k, args.batch), args.queries)
+    rows = [("float32 (RAM)", 1.0, base_qps, vectors.nbytes, vectors.nbytes)]
+
+    workdir = Path(tempfile.mkdtemp(prefix="qvec-bench-"))
+    try:
+        for dtype in ("int8", "float16"):
+            store = QuantizedVectorStore(workdir / dtype, args.dim, dtype=dtype)
+            store.add(vectors)
+            store.flush()
+            q_bytes, f32_bytes = store.nbytes()
+
+            for rescore in (False, True):
+                def run():
+                    found = [store.search(queries[s:s + args.batch], args.k, rescore=rescore)[0]
+                             for s in range(0, args.queries, args.batch)]
+                    return np.concatenate(found)
+
+                found, qps = timed(run, args.queries)
+                label = f"{dtype}{' + rescore' if rescore else ''}"
+                rows.append((label, recall_at_k(found, truth), qps, q_bytes, q_bytes + f32_bytes))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'mode':<20}{'recall@' + str(args.k):>10}{'QPS':>10}{'scan MB':>10}{'disk MB':>10}")
+    for label, recall, qps, scan_bytes, disk_bytes in rows:
+        print(f"{label:<20}{recall:>10.3f}{qps:>10.0f}{scan_bytes / 2**20:>10.1f}{disk_bytes / 2**20:>10.1f}")
@@ -0,0 +1,326 @@
+"""
+Context compression for prompts built from chat history and retrieved chunks.
+
+Before the LLM call, each prompt section goes through three cheap local steps:
+
+→ Near-duplicate removal: 64-bit SimHash over word shingles. Messages or
+  chunks within a few bits of one already kept are dropped. Short messages
+  ("yes", "ok, go ahead") are never deduped: their repeats carry meaning.
+→ Relevance filtering: sentences are scored against the question with BM25.
+  The lowest-scoring ones go first when a section is over budget.
+→ Hard token budgets per section (system, history, context, question). The
+  most recent history messages are kept whole while they fit the history
+  budget; past that, the oldest of them are dropped and the newest is cut
+  at the budget. The system and question sections are cut at their budgets.
+
+Every call returns a CompressionReport with tokens before and after per section.
+compress_inputs() wraps a compressor as a Runnable so it can sit in front of
+a prompt, e.g. `compress_inputs(compressor) | prompt | llm`.
+"""
+
+import re
+import math
+import hashlib
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# → TOKEN COUNTING
+# -------------------------------
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # → tiktoken missing or its encoding file cannot be downloaded
+    _encoding = None
+
+
+def count_tokens(text):
+    """
+    Counts tokens with tiktoken when available, else estimates ~4 characters per token.
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+# -------------------------------
+# → NEAR-DUPLICATE DETECTION (SIMHASH)
+# -------------------------------
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def simhash(text, shingle_size=3):
+    """
+    64-bit SimHash of the word shingles in `text`.
+    """
+    words = _words(text)
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def dedupe(items, text_of=str, max_distance=3, keep="first", min_tokens=0):
+    """
+    Drops items whose SimHash is within `max_distance` bits of an item already kept.
+
+    keep="last" scans from the end, so the most recent copy of a repeated
+    message is the one that survives. Items under `min_tokens` tokens are
+    always kept and never used as a fingerprint.
+    """
+    ordered = list(items) if keep == "first" else list(reversed(items))
+    kept, fingerprints = [], []
+
+    for item in ordered:
+        text = text_of(item)
+        if count_tokens(text) < min_tokens:
+            kept.append(item)
+            continue
+        fp = simhash(text)
+        if any(hamming(fp, other) <= max_distance for other in fingerprints):
+            continue
+        fingerprints.append(fp)
+        kept.append(item)
+
+    return kept if keep == "first" else list(reversed(kept))
+
+# -------------------------------
+# → SENTENCE RELEVANCE (BM25)
+# -------------------------------
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def bm25_scores(sentences, query, k1=1.2, b=0.75):
+    """
+    Scores each sentence against `query`, treating the sentences as the corpus.
+    """
+    docs = [_words(s) for s in sentences]
+    query_terms = set(_words(query))
+    if not docs or not query_terms:
+        return [0.0] * len(docs)
+
+    avg_len = sum(len(d) for d in docs) / len(docs) or 1.0
+    df = Counter(term for d in docs for term in set(d))
+    n = len(docs)
+
+    scores = []
+    for doc in docs:
+        tf = Counter(doc)
+        score = 0.0
+        for term in query_terms:
+            if term not in tf:
+                continue
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            score += idf * tf[term] * (k1 + 1) / (tf[term] + k1 * (1 - b + b * len(doc) / avg_len))
+        scores.append(score)
+    return scores
+
+
+def fit_sentences(units, query, budget):
+    """
+    Keeps the most relevant sentences of `units` within `budget` tokens.
+
+    `units` is a list of texts (messages or chunks). Returns the same list with
+    low-relevance sentences removed; texts left empty come back as "".
+    """
+    sentences = [(u, s) for u, text in enumerate(units) for s in split_sentences(text)]
+    scores = bm25_scores([s for _, s in sentences], query)
+
+    # → Most relevant first; ties go to later (more recent) sentences
+    ranked = sorted(range(len(sentences)), key=lambda i: (scores[i], i), reverse=True)
+    chosen, used = set(), 0
+    for i in ranked:
+        cost = count_tokens(sentences[i][1])
+        if used + cost > budget:
+            continue
+        chosen.add(i)
+        used += cost
+
+    kept = [[] for _ in units]
+    for i in sorted(chosen):
+        unit, sentence = sentences[i]
+        kept[unit].append(sentence)
+    return [" ".join(parts) for parts in kept]
+
+# -------------------------------
+# → COMPRESSOR
+# -------------------------------
+
+@dataclass
+class CompressionReport:
+    tokens_before: dict = field(default_factory=dict)
+    tokens_after: dict = field(default_factory=dict)
+    duplicates_removed: int = 0
+
+    @property
+    def tokens_saved(self):
+        return sum(self.tokens_before.values()) - sum(self.tokens_after.values())
+
+    def __str__(self):
+        before = sum(self.tokens_before.values())
+        after = sum(self.tokens_after.values())
+        return (
+            f"{before} → {after} tokens (saved {self.tokens_saved}, "
+            f"{self.duplicates_removed} duplicates removed)"
+        )
+
+
+DEFAULT_BUDGETS = {"system": 300, "history": 1500, "context": 2000, "question": 500}
+
+
+class ContextCompressor:
+    """
+    Compresses the system, history, context and question sections of a prompt.
+    """
+
+    def __init__(self, budgets=None, keep_recent=2, max_distance=3, min_dedupe_tokens=12):
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.keep_recent = keep_recent
+        self.max_distance = max_distance
+        self.min_dedupe_tokens = min_dedupe_tokens  # → shorter messages are never deduped
+
+    def _truncate(self, text, budget):
+        """
+        Last resort for sections that must stay whole: cut at the token budget.
+        """
+        if count_tokens(text) <= budget:
+            return text
+        if _encoding is not None:
+            return _encoding.decode(_encoding.encode(text, disallowed_special=())[:budget])
+        return text[:budget * 4]
+
+    def compress_history(self, messages, question, report):
+        before = sum(count_tokens(m.content) for m in messages)
+        unique = dedupe(messages, text_of=lambda m: f"{m.type}: {m.content}",
+                        max_distance=self.max_distance, keep="last", min_tokens=self.min_dedupe_tokens)
+        report.duplicates_removed += len(messages) - len(unique)
+        messages = unique
+
+        budget = self.budgets["history"]
+        recent = messages[-self.keep_recent:] if self.keep_recent else []
+        older = messages[:len(messages) - len(recent)]
+
+        # → The recent window must fit the budget too: drop its oldest messages
+        #   first, then cut the newest one if it alone is still too long
+        while len(recent) > 1 and sum(count_tokens(m.content) for m in recent) > budget:
+            recent = recent[1:]
+        if recent and count_tokens(recent[-1].content) > budget:
+            recent[-1] = recent[-1].model_copy(
+                update={"content": self._truncate(recent[-1].content, budget)}
+            )
+
+        recent_tokens = sum(count_tokens(m.content) for m in recent)
+        older_budget = max(0, budget - recent_tokens)
+
+        if sum(count_tokens(m.content) for m in older) > older_budget:
+            texts = fit_sentences([m.content for m in older], question, older_budget)
+            older = [m.model_copy(update={"content": t}) for m, t in zip(older, texts) if t]
+
+        result = older + recent
+        report.tokens_before["history"] = before
+        report.tokens_after["history"] = sum(count_tokens(m.content) for m in result)
+        return result
+
+    def compress_context(self, chunks, question, report):
+        before = sum(count_tokens(c) for c in chunks)
+        unique = dedupe(chunks, max_distance=self.max_distance, keep="first")
+        report.duplicates_removed += len(chunks) - len(unique)
+
+        budget = self.budgets["context"]
+        if sum(count_tokens(c) for c in unique) > budget:
+            unique = [c for c in fit_sentences(unique, question, budget) if c]
+
+        report.tokens_before["context"] = before
+        report.tokens_after["context"] = sum(count_tokens(c) for c in unique)
+        return unique
+
+    def compress(self, question, history=None, context=None, system=None):
+        """
+        Returns (sections, report), where sections holds the compressed
+        "system", "history", "context" and "question" values.
+        """
+        report = CompressionReport()
+        sections = {}
+
+        if system is not None:
+            sections["system"] = self._truncate(system, self.budgets["system"])
+            report.tokens_before["system"] = count_tokens(system)
+            report.tokens_after["system"] = count_tokens(sections["system"])
+
+        if history is not None:
+            sections["history"] = self.compress_history(history, question, report)
+
+        if context is not None:
+            sections["context"] = self.compress_context(context, question, report)
+
+        sections["question"] = self._truncate(question, self.budgets["question"])
+        report.tokens_before["question"] = count_tokens(question)
+        report.tokens_after["question"] = count_tokens(sections["question"])
+
+        return sections, report
+
+# -------------------------------
+# → RUNNABLE WRAPPER
+# -------------------------------
+
+def compress_inputs(compressor, question_key="input", history_key="history", context_key=None,
+                    on_report=None):
+    """
+    Runnable that compresses a prompt's input dict in place of the raw values.
+
+    `context_key` may point at a list of strings or LangChain Documents.
+    `on_report` is called with each CompressionReport (defaults to a debug log).
+    """
+    def _compress(inputs):
+        context = inputs.get(context_key) if context_key else None
+        if context and not isinstance(context[0], str):
+            context = [doc.page_content for doc in context]
+
+        history = inputs.get(history_key)
+        if history is not None and not all(isinstance(m, BaseMessage) for m in history):
+            history = None
+
+        sections, report = compressor.compress(
+            question=inputs[question_key], history=history, context=context,
+        )
+        (on_report or (lambda r: logger.debug("context compression: %s", r)))(report)
+
+        out = dict(inputs)
+        out[question_key] = sections["question"]
+        if history is not None:
+            out[history_key] = sections["history"]
+        if context is not None:
+            out[context_key] = "\n\n".join(sections["context"])
+        return out
+
+    return RunnableLambda(_compress)
@@ -3,10 +3,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Ollama
-from langchain_ollama import ChatOllama
+from langchain_ollama import ChatOllama, OllamaEmbeddings
 
 # Azure OpenAI
-from langchain_community.chat_models import AzureChatOpenAI
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+
+from rate_limiter import rate_limited_http_clients
 
 
 def get_llm_ollama():
@@ -18,18 +20,52 @@ def get_llm_ollama():
     return ChatOllama(base_url=base_url, model=model_name)
 
 
-def get_llm_azure():
+def get_llm_azure(rpm=None, tpm=None, max_retries=6, **kwargs):
     """
     Returns an instance of AzureChatOpenAI using environment variables.
+
+    Requests go through the shared per-deployment rate limiter in rate_limiter.py.
+    The limits default to AZURE_OPENAI_RPM / AZURE_OPENAI_TPM from the environment.
+    `max_retries` applies to the rate-limited transport, which retries 429s,
+    408/409/5xx and connection errors; the openai client itself never retries.
     """
     api_key = os.getenv("AZURE_OPENAI_API_KEY")
     api_version = os.getenv("AZURE_OPENAI_API_VERSION")
     endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
     deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
+    rpm = rpm or int(os.getenv("AZURE_OPENAI_RPM", "60"))
+    tpm = tpm or int(os.getenv("AZURE_OPENAI_TPM", "60000"))
+    http_client, http_async_client = rate_limited_http_clients(deployment, rpm, tpm, max_retries=max_retries)
+
     return AzureChatOpenAI(
         api_key=api_key,
         api_version=api_version,
         azure_endpoint=endpoint,
         deployment_name=deployment,
+        http_client=http_client,
+        http_async_client=http_async_client,
+        max_retries=0,  # → Retries happen in the rate-limited transport, under the shared budget
+        **kwargs,
+    )
+
+
+def get_embeddings_ollama():
+    """
+    Returns an instance of OllamaEmbeddings using a local embedding model.
+    """
+    base_url = "http://localhost:11434"
+    model_name = "nomic-embed-text"
+    return OllamaEmbeddings(base_url=base_url, model=model_name)
+
+
+def get_embeddings_azure():
+    """
+    Returns an instance of AzureOpenAIEmbeddings using environment variables.
+    """
+    return AzureOpenAIEmbeddings(
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
     )
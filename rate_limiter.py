@@ -0,0 +1,362 @@
+"""
+Adaptive, shared rate limiting for Azure OpenAI deployments.
+
+→ One AdaptiveRateLimiter per deployment tracks requests-per-minute and
+  tokens-per-minute with two token buckets shared by every chain in the process.
+→ The server's x-ratelimit-remaining-* and retry-after headers correct the
+  buckets, so the local view never drifts far from what Azure enforces.
+→ 429s, 408/409/5xx responses and dropped connections or timeouts are retried
+  inside the HTTP transport with jittered backoff, but only while the global
+  RetryBudget has credit, so a burst of failures cannot turn into a
+  thundering herd of retries. The openai client itself is set to 0 retries,
+  so this is the only retry layer.
+
+get_llm_azure() in llm_access.py wires this in through rate_limited_http_clients().
+"""
+
+import time
+import json
+import random
+import asyncio
+import threading
+
+import httpx
+
+# -------------------------------
+# → TOKEN BUCKET
+# -------------------------------
+
+class TokenBucket:
+    """
+    Classic token bucket that may go into debt: a caller takes what it needs
+    immediately and is told how long to wait before the bucket is positive again.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def clamp(self, remaining, now):
+        """
+        Lowers the local balance to what the server says is left.
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+# -------------------------------
+# → ADAPTIVE RATE LIMITER
+# -------------------------------
+
+class AdaptiveRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter for one deployment.
+
+    The refill rate backs off multiplicatively on every 429 and creeps back up
+    towards the configured limits on every success (AIMD).
+    """
+
+    def __init__(self, rpm, tpm, min_fraction=0.1, decrease=0.7, increase=0.02):
+        self.max_rpm = rpm
+        self.max_tpm = tpm
+        self.min_fraction = min_fraction
+        self.decrease = decrease
+        self.increase = increase
+        self.fraction = 1.0
+
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.blocked_until - now,
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now),
+            )
+            return max(wait, 0.0)
+
+    def acquire(self, tokens=0):
+        """
+        Blocks until one request carrying `tokens` tokens may be sent.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens=0):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _set_fraction(self, fraction):
+        self.fraction = min(1.0, max(self.min_fraction, fraction))
+        self.requests.rate = self.max_rpm * self.fraction / 60.0
+        self.tokens.rate = self.max_tpm * self.fraction / 60.0
+
+    def update_from_headers(self, status_code, headers):
+        """
+        Adapts the buckets to one response from the deployment.
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            remaining_requests = _header_float(headers, "x-ratelimit-remaining-requests")
+            remaining_tokens = _header_float(headers, "x-ratelimit-remaining-tokens")
+            if remaining_requests is not None:
+                self.requests.clamp(remaining_requests, now)
+            if remaining_tokens is not None:
+                self.tokens.clamp(remaining_tokens, now)
+
+            if status_code == 429:
+                self._set_fraction(self.fraction * self.decrease)
+                retry_after = retry_after_seconds(headers)
+                if retry_after is not None:
+                    # → Everyone waits for the same instant instead of retrying on their own clock
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+            elif status_code < 400:
+                self._set_fraction(self.fraction + self.increase)
+
+# -------------------------------
+# → RETRY BUDGET
+# -------------------------------
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic.
+
+    Every request deposits `ratio` credits and every retry spends one, with a
+    small per-second allowance so low-traffic callers can still retry.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_balance=50.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self.balance = max_balance
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.max_balance, self.balance + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def record_request(self):
+        with self._lock:
+            self._refill()
+            self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            self._refill()
+            if self.balance < 1.0:
+                return False
+            self.balance -= 1.0
+            return True
+
+# -------------------------------
+# → HELPERS
+# -------------------------------
+
+def _header_float(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(headers):
+    """
+    Reads retry-after-ms or retry-after (seconds) from a response.
+    """
+    retry_after_ms = _header_float(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000.0
+    return _header_float(headers, "retry-after")
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """
+    Full-jitter exponential backoff.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# → Same statuses the openai client retries by default
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+# → Connect / read timeouts, connection resets, servers closing mid-response
+RETRYABLE_TRANSPORT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+def is_retryable_status(status_code):
+    return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+
+def response_retry_delay(response, attempt, cap=60.0):
+    """
+    Delay before retrying `response`. A 429's retry-after is already enforced
+    by the limiter, so only other statuses honor the header here.
+    """
+    retry_after = None if response.status_code == 429 else retry_after_seconds(response.headers)
+    if retry_after is not None:
+        return min(retry_after, cap)
+    return backoff_delay(attempt)
+
+
+def estimate_request_tokens(request, default_completion=256):
+    """
+    Rough token cost of a chat completion request: ~4 characters per prompt
+    token plus the completion budget the request asks for.
+    """
+    try:
+        body = json.loads(request.content or b"{}")
+    except ValueError:
+        return default_completion
+
+    prompt_chars = sum(len(str(m.get("content") or "")) for m in body.get("messages", []))
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or default_completion
+    return prompt_chars // 4 + completion
+
+# -------------------------------
+# → HTTPX TRANSPORTS
+# -------------------------------
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    Wraps an httpx transport: acquires the limiter before every request, feeds
+    response headers back into it and retries 429s, 408/409/5xx and transport
+    errors within the retry budget.
+    """
+
+    def __init__(self, limiter, budget, transport=None, max_retries=6):
+        self.limiter = limiter
+        self.budget = budget
+        self.transport = transport or httpx.HTTPTransport()
+        self.max_retries = max_retries
+
+    def _may_retry(self, attempt):
+        return attempt < self.max_retries and self.budget.try_spend()
+
+    def handle_request(self, request):
+        tokens = estimate_request_tokens(request)
+        self.budget.record_request()
+        attempt = 0
+
+        while True:
+            self.limiter.acquire(tokens)
+            try:
+                response = self.transport.handle_request(request)
+            except RETRYABLE_TRANSPORT_ERRORS:
+                if not self._may_retry(attempt):
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self.limiter.update_from_headers(response.status_code, response.headers)
+            if not is_retryable_status(response.status_code) or not self._may_retry(attempt):
+                return response
+
+            response.close()
+            time.sleep(response_retry_delay(response, attempt))
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Async twin of RateLimitedTransport, sharing the same limiter and budget.
+    """
+
+    def __init__(self, limiter, budget, transport=None, max_retries=6):
+        self.limiter = limiter
+        self.budget = budget
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_retries = max_retries
+
+    def _may_retry(self, attempt):
+        return attempt < self.max_retries and self.budget.try_spend()
+
+    async def handle_async_request(self, request):
+        tokens = estimate_request_tokens(request)
+        self.budget.record_request()
+        attempt = 0
+
+        while True:
+            await self.limiter.aacquire(tokens)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except RETRYABLE_TRANSPORT_ERRORS:
+                if not self._may_retry(attempt):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self.limiter.update_from_headers(response.status_code, response.headers)
+            if not is_retryable_status(response.status_code) or not self._may_retry(attempt):
+                return response
+
+            await response.aclose()
+            await asyncio.sleep(response_retry_delay(response, attempt))
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+# -------------------------------
+# → SHARED REGISTRY
+# -------------------------------
+
+_limiters = {}
+_registry_lock = threading.Lock()
+
+# → One retry budget for the whole process, across all deployments
+RETRY_BUDGET = RetryBudget()
+
+
+def get_rate_limiter(deployment, rpm, tpm):
+    """
+    Returns the process-wide limiter for `deployment`, creating it on first use.
+    """
+    with _registry_lock:
+        if deployment not in _limiters:
+            _limiters[deployment] = AdaptiveRateLimiter(rpm, tpm)
+        return _limiters[deployment]
+
+
+def rate_limited_http_clients(deployment, rpm, tpm, budget=None, max_retries=6):
+    """
+    Returns (httpx.Client, httpx.AsyncClient) that share one deployment limiter.
+    """
+    limiter = get_rate_limiter(deployment, rpm, tpm)
+    budget = budget or RETRY_BUDGET
+    sync_client = httpx.Client(
+        transport=RateLimitedTransport(limiter, budget, max_retries=max_retries),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+    )
+    async_client = httpx.AsyncClient(
+        transport=AsyncRateLimitedTransport(limiter, budget, max_retries=max_retries),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+    )
+    return sync_client, async_client
@@ -0,0 +1,276 @@
+"""
+Quantized, memory-mapped on-disk storage for embeddings.
+
+A store is a directory of append-only segments. Each segment is written once
+and never modified, as two files:
+
+→ seg-000001.q    header + quantized codes + per-vector scales + ids
+→ seg-000001.f32  the original float32 vectors, used only for rescoring
+
+Layout of a .q file (little-endian, sections 64-byte aligned):
+
+    [0:64)   header: magic b"QVEC", version u16, dtype u8, dim u32, count u64
+    [64: )   codes   count x dim   int8 (or float16)
+             scales  count         float32  (1.0 for float16 segments)
+             ids     count         int64
+
+Both files are opened with numpy.memmap in read-only mode. Every process
+that opens the store shares the same page-cache pages, with no copies.
+
+Search is done in two passes. First, queries are scored against the
+quantized codes block by block; each block is widened to float32 and run
+through one BLAS matmul for all queries at once. Then the best
+`k * rescore_factor` candidates per query are rescored exactly against
+their float32 vectors, which touches only those rows of the .f32 file.
+"""
+
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"QVEC"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxIQ")  # → magic, version, dtype code, pad, dim, count
+HEADER_SIZE = 64
+ALIGN = 64
+
+DTYPES = {1: np.int8, 2: np.float16}
+DTYPE_CODES = {"int8": 1, "float16": 2}
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def quantize(vectors, dtype="int8"):
+    """
+    Returns (codes, scales) for a float32 matrix.
+
+    int8 uses symmetric per-vector scaling (max |x| maps to 127); float16 is a
+    plain cast with unit scales.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+# -------------------------------
+# → SEGMENT
+# -------------------------------
+
+class Segment:
+    """
+    One immutable, memory-mapped segment.
+    """
+
+    def __init__(self, q_path):
+        self.q_path = Path(q_path)
+        self.f32_path = self.q_path.with_suffix(".f32")
+
+        with open(self.q_path, "rb") as f:
+            magic, version, dtype_code, dim, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.q_path} is not a vector segment (version {VERSION})")
+
+        self.dim, self.count = dim, count
+        self.dtype = DTYPES[dtype_code]
+
+        codes_offset = HEADER_SIZE
+        scales_offset = _align(codes_offset + count * dim * np.dtype(self.dtype).itemsize)
+        ids_offset = _align(scales_offset + count * 4)
+
+        self.codes = np.memmap(self.q_path, dtype=self.dtype, mode="r", offset=codes_offset, shape=(count, dim))
+        self.scales = np.memmap(self.q_path, dtype=np.float32, mode="r", offset=scales_offset, shape=(count,))
+        self.ids = np.memmap(self.q_path, dtype=np.int64, mode="r", offset=ids_offset, shape=(count,))
+        self.vectors = np.memmap(self.f32_path, dtype=np.float32, mode="r", shape=(count, dim))
+
+    @staticmethod
+    def write(q_path, vectors, ids, dtype="int8"):
+        """
+        Writes a new segment atomically (temp files, then rename).
+        """
+        q_path = Path(q_path)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        count, dim = vectors.shape
+        codes, scales = quantize(vectors, dtype)
+
+        f32_path = q_path.with_suffix(".f32")
+        tmp_f32 = f32_path.with_suffix(".f32.tmp")
+        vectors.tofile(tmp_f32)
+
+        tmp_q = q_path.with_suffix(".q.tmp")
+        with open(tmp_q, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], dim, count).ljust(HEADER_SIZE, b"\0"))
+            for array in (codes, scales, np.asarray(ids, dtype=np.int64)):
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(np.ascontiguousarray(array).tobytes())
+
+        # → .f32 first: a .q file on disk always has its .f32 partner
+        os.replace(tmp_f32, f32_path)
+        os.replace(tmp_q, q_path)
+
+    def approx_scores(self, queries, start, stop):
+        """
+        Approximate dot products of `queries` (m x dim) with rows [start, stop).
+        """
+        block = self.codes[start:stop].astype(np.float32)
+        return (block @ queries.T) * self.scales[start:stop, None]
+
+# -------------------------------
+# → STORE
+# -------------------------------
+
+class QuantizedVectorStore:
+    """
+    Append-only store of quantized vectors with exact float32 rescoring.
+
+    Vectors are buffered in memory by add() and written as a new segment by
+    flush() (or automatically once `segment_size` are buffered).
+    """
+
+    def __init__(self, path, dim, dtype="int8", normalize=True, segment_size=100_000,
+                 block_rows=16_384, rescore_factor=4):
+        if dtype not in DTYPE_CODES:
+            raise ValueError(f"dtype must be one of {sorted(DTYPE_CODES)}, got {dtype!r}")
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.dtype = dtype
+        self.normalize = normalize
+        self.segment_size = segment_size
+        self.block_rows = block_rows
+        self.rescore_factor = rescore_factor
+
+        self.segments = [Segment(p) for p in sorted(self.path.glob("seg-*.q"))]
+        for segment in self.segments:
+            if segment.dim != dim:
+                raise ValueError(f"{segment.q_path} has dim {segment.dim}, expected {dim}")
+
+        self._pending_vectors = []
+        self._pending_ids = []
+        self._next_id = max((int(s.ids.max()) + 1 for s in self.segments if s.count), default=0)
+
+    def __len__(self):
+        return sum(s.count for s in self.segments) + sum(len(ids) for ids in self._pending_ids)
+
+    def _prepare(self, vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"expected vectors of dim {self.dim}, got {vectors.shape[1]}")
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        return vectors
+
+    def add(self, vectors, ids=None):
+        """
+        Buffers vectors for the next segment and returns their ids.
+
+        Ids default to consecutive integers; explicit ids are used as given.
+        """
+        if len(vectors) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        vectors = self._prepare(vectors)
+        if ids is None:
+            ids = np.arange(self._next_id, self._next_id + len(vectors), dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if len(ids) != len(vectors):
+            raise ValueError(f"got {len(ids)} ids for {len(vectors)} vectors")
+        self._next_id = max(self._next_id, int(ids.max()) + 1)
+
+        self._pending_vectors.append(vectors)
+        self._pending_ids.append(ids)
+        if sum(len(v) for v in self._pending_vectors) >= self.segment_size:
+            self.flush()
+        return ids
+
+    def flush(self):
+        if not self._pending_vectors:
+            return
+        vectors = np.concatenate(self._pending_vectors)
+        ids = np.concatenate(self._pending_ids)
+        self._pending_vectors, self._pending_ids = [], []
+
+        for start in range(0, len(vectors), self.segment_size):
+            q_path = self.path / f"seg-{len(self.segments) + 1:06d}.q"
+            Segment.write(q_path, vectors[start:start + self.segment_size],
+                          ids[start:start + self.segment_size], self.dtype)
+            self.segments.append(Segment(q_path))
+
+    # → Search
+
+    def search(self, queries, k=10, rescore=True):
+        """
+        Returns (ids, scores), each of shape (len(queries), k), best first.
+
+        Scores are dot products (cosine similarity when normalize=True).
+        Only flushed vectors are searched.
+        """
+        queries = self._prepare(queries)
+        m = len(queries)
+        n_candidates = k * self.rescore_factor if rescore else k
+
+        # → Pass 1: running top-n_candidates over quantized blocks of every segment
+        best_scores = np.full((m, 0), -np.inf, dtype=np.float32)
+        best_refs = np.empty((m, 0, 2), dtype=np.int64)  # → (segment index, row)
+
+        for seg_index, segment in enumerate(self.segments):
+            for start in range(0, segment.count, self.block_rows):
+                stop = min(start + self.block_rows, segment.count)
+                scores = segment.approx_scores(queries, start, stop).T  # → m x rows
+
+                # → Cut each block down to its own top candidates before merging
+                keep = min(n_candidates, stop - start)
+                top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+                scores = np.take_along_axis(scores, top, axis=1)
+                refs = np.stack([np.full(top.shape, seg_index), top + start], axis=-1)
+
+                merged_scores = np.concatenate([best_scores, scores], axis=1)
+                merged_refs = np.concatenate([best_refs, refs], axis=1)
+                keep = min(n_candidates, merged_scores.shape[1])
+                top = np.argpartition(-merged_scores, keep - 1, axis=1)[:, :keep]
+
+                best_scores = np.take_along_axis(merged_scores, top, axis=1)
+                best_refs = np.take_along_axis(merged_refs, top[..., None], axis=1)
+
+        if best_scores.shape[1] == 0:
+            return np.empty((m, 0), dtype=np.int64), np.empty((m, 0), dtype=np.float32)
+
+        # → Pass 2: exact float32 rescoring of the candidates only
+        if rescore:
+            for seg_index, segment in enumerate(self.segments):
+                mask = best_refs[..., 0] == seg_index
+                if not mask.any():
+                    continue
+                qi, ci = np.nonzero(mask)
+                rows = best_refs[qi, ci, 1]
+                order = np.argsort(rows)  # → sequential reads from the memmap
+                exact = np.einsum("ij,ij->i", segment.vectors[rows[order]], queries[qi[order]])
+                best_scores[qi[order], ci[order]] = exact
+
+        keep = min(k, best_scores.shape[1])
+        order = np.argsort(-best_scores, axis=1)[:, :keep]
+        final_scores = np.take_along_axis(best_scores, order, axis=1)
+        final_refs = np.take_along_axis(best_refs, order[..., None], axis=1)
+
+        ids = np.empty(final_scores.shape, dtype=np.int64)
+        for seg_index, segment in enumerate(self.segments):
+            mask = final_refs[..., 0] == seg_index
+            ids[mask] = segment.ids[final_refs[..., 1][mask]]
+        return ids, final_scores
+
+    def nbytes(self):
+        """
+        Bytes on disk, as (quantized files, float32 files).
+        """
+        q = sum(s.q_path.stat().st_size for s in self.segments)
+        f32 = sum(s.f32_path.stat().st_size for s in self.segments)
+        return q, f32